@@ -0,0 +1,281 @@
+import asyncio
+import heapq
+import itertools
+import time
+import uuid
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from email.utils import parsedate_to_datetime
+from typing import Awaitable, Callable, Dict, List, Optional, Protocol, Tuple
+
+import httpx
+
+TICKET_PREFIX = "q-"
+
+
+class TicketLost(Exception):
+    """Тикет стоял в очереди, когда процесс остановился: отправки не было."""
+
+
+class TicketCancelled(Exception):
+    """Тикет снят с очереди до отправки (например, проигравший в хедже)."""
+
+
+class TicketStore(Protocol):
+    def record_ticket(self, ticket_id: str, job_id: Optional[str] = None, error: Optional[str] = None) -> None: ...
+    def load_ticket(self, ticket_id: str) -> Optional[Tuple[Optional[str], Optional[str]]]: ...
+
+
+class QueueFull(Exception):
+    def __init__(self, retry_after: float):
+        super().__init__("submission queue is full")
+        self.retry_after = retry_after
+
+
+def retry_after_of(exc: BaseException) -> Optional[float]:
+    """Задержка перед повтором для «провайдер перегружен» (429/5xx, сеть); None — ошибка не ретраится."""
+    if isinstance(exc, httpx.TransportError):
+        return 1.0
+    if not isinstance(exc, httpx.HTTPStatusError):
+        return None
+    code = exc.response.status_code
+    if code != 429 and code < 500:
+        return None
+    value = exc.response.headers.get("Retry-After", "").strip()
+    if value.isdigit():
+        return float(value)
+    if value:
+        try:
+            return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+        except (TypeError, ValueError):
+            pass
+    return 1.0
+
+
+class TokenBucket:
+    """Token bucket с AIMD: перегрузка у провайдера режет скорость вдвое, успехи возвращают её понемногу."""
+
+    def __init__(self, rate: float, burst: int, min_rate: float):
+        self.max_rate = rate
+        self.min_rate = min_rate
+        self.rate = rate
+        self.burst = burst
+        self.tokens = float(burst)
+        self.paused_until = 0.0
+        self._updated = time.monotonic()
+
+    def _refill(self, now: float) -> None:
+        self.tokens = min(self.burst, self.tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def delay(self) -> float:
+        """Сколько секунд ждать до следующего токена (0 — можно брать сейчас)."""
+        now = time.monotonic()
+        self._refill(now)
+        pause = max(0.0, self.paused_until - now)
+        if self.tokens >= 1:
+            return pause
+        return max(pause, (1 - self.tokens) / self.rate)
+
+    def take(self) -> None:
+        self._refill(time.monotonic())
+        self.tokens -= 1
+
+    def penalize(self, retry_after: float) -> None:
+        now = time.monotonic()
+        self.rate = max(self.min_rate, self.rate / 2)
+        self.tokens = min(self.tokens, 0.0)
+        self.paused_until = max(self.paused_until, now + retry_after)
+
+    def reward(self) -> None:
+        self.rate = min(self.max_rate, self.rate + self.max_rate / 10)
+
+
+@dataclass(order=True)
+class Ticket:
+    sort_key: Tuple[int, int]
+    ticket_id: str = field(compare=False)
+    submit: Callable[[], Awaitable[str]] = field(compare=False, repr=False)
+    future: asyncio.Future = field(compare=False, repr=False)
+    attempts: int = field(default=0, compare=False)
+
+
+class AdmissionController:
+    """Ограничение скорости отправки к провайдеру с очередью по приоритету.
+
+    Отправки проходят через TokenBucket; 429/5xx от провайдера замедляют его и
+    возвращают задачу в очередь на прежнее место (с учётом Retry-After).
+    Исходы тикетов дублируются в store (журнал), чтобы выданный клиенту q-… пережил рестарт.
+    """
+
+    def __init__(
+        self,
+        rate: float,
+        burst: int,
+        min_rate: float,
+        max_queue: int,
+        max_retries: int,
+        max_tickets: int = 10000,
+        store: Optional[TicketStore] = None,
+    ):
+        self.bucket = TokenBucket(rate, burst, min_rate)
+        self.max_queue = max_queue
+        self.max_retries = max_retries
+        self.max_tickets = max_tickets
+        self.store = store
+        self._queue: List[Ticket] = []
+        self._seq = itertools.count()
+        self._wakeup = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+        # ticket_id → job_id | Exception | None (ещё в очереди)
+        self._tickets: "OrderedDict[str, object]" = OrderedDict()
+        self.dispatched = 0
+        self.throttled = 0
+        self.rejected = 0
+
+    def start(self) -> None:
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    @staticmethod
+    def new_ticket_id() -> str:
+        return f"{TICKET_PREFIX}{uuid.uuid4().hex}"
+
+    def submit(
+        self,
+        submit: Callable[[], Awaitable[str]],
+        priority: int = 0,
+        ticket_id: Optional[str] = None,
+    ) -> "asyncio.Future[str]":
+        """Поставить отправку в очередь. Future завершится job_id от провайдера."""
+        if len(self._queue) >= self.max_queue:
+            self.rejected += 1
+            raise QueueFull(retry_after=max(1.0, len(self._queue) / self.bucket.rate))
+        ticket = Ticket(
+            sort_key=(-priority, next(self._seq)),
+            ticket_id=ticket_id or self.new_ticket_id(),
+            submit=submit,
+            future=asyncio.get_running_loop().create_future(),
+        )
+        self._remember(ticket.ticket_id, None)
+        heapq.heappush(self._queue, ticket)
+        self._wakeup.set()
+        self.start()
+        return ticket.future
+
+    def bind(self, ticket_id: str, result: object) -> None:
+        """Запомнить, чем закончился тикет: job_id или исключение."""
+        self._remember(ticket_id, result)
+
+    def cancel(self, ticket_id: str) -> bool:
+        """Снять тикет с очереди, пока он не отправлен. False — его уже нет в очереди."""
+        for ticket in self._queue:
+            if ticket.ticket_id == ticket_id and not ticket.future.done():
+                self._queue.remove(ticket)
+                heapq.heapify(self._queue)
+                ticket.future.cancel()
+                self.bind(ticket_id, TicketCancelled("removed from the submission queue before dispatch"))
+                return True
+        return False
+
+    def _load(self, ticket_id: str) -> object:
+        if self.store is None:
+            return None
+        row = self.store.load_ticket(ticket_id)
+        if row is None:
+            return None
+        job_id, error = row
+        if job_id:
+            return job_id
+        if error:
+            return RuntimeError(error)
+        return TicketLost("the submission was still queued when the service restarted; resubmit the request")
+
+    def is_ticket(self, job_id: str) -> bool:
+        if not job_id.startswith(TICKET_PREFIX):
+            return False
+        return job_id in self._tickets or self._load(job_id) is not None
+
+    def ticket_state(self, ticket_id: str) -> object:
+        """job_id | Exception | None (ещё в очереди); после рестарта — из store."""
+        if ticket_id in self._tickets:
+            return self._tickets[ticket_id]
+        return self._load(ticket_id)
+
+    def position(self, ticket_id: str) -> Optional[int]:
+        """Позиция тикета в очереди (1 — следующий), None — уже не в очереди."""
+        for pos, ticket in enumerate(sorted(self._queue), start=1):
+            if ticket.ticket_id == ticket_id:
+                return pos
+        return None
+
+    def _remember(self, ticket_id: str, result: object) -> None:
+        if self.store is not None:
+            self.store.record_ticket(
+                ticket_id,
+                job_id=result if isinstance(result, str) else None,
+                error=str(result) if isinstance(result, BaseException) else None,
+            )
+        self._tickets[ticket_id] = result
+        self._tickets.move_to_end(ticket_id)
+        while len(self._tickets) > self.max_tickets:
+            self._tickets.popitem(last=False)
+
+    async def _run(self) -> None:
+        while True:
+            if not self._queue:
+                self._wakeup.clear()
+                await self._wakeup.wait()
+                continue
+            delay = self.bucket.delay()
+            if delay > 0:
+                await asyncio.sleep(delay)
+                continue
+            ticket = heapq.heappop(self._queue)
+            if ticket.future.done():
+                continue
+            self.bucket.take()
+            asyncio.create_task(self._dispatch(ticket))
+
+    async def _dispatch(self, ticket: Ticket) -> None:
+        ticket.attempts += 1
+        try:
+            job_id = await ticket.submit()
+        except Exception as e:
+            retry_after = retry_after_of(e)
+            if retry_after is not None:
+                self.throttled += 1
+                self.bucket.penalize(retry_after)
+                if ticket.attempts <= self.max_retries:
+                    heapq.heappush(self._queue, ticket)
+                    self._wakeup.set()
+                    return
+            self.bind(ticket.ticket_id, e)
+            if not ticket.future.done():
+                ticket.future.set_exception(e)
+            return
+        self.dispatched += 1
+        self.bucket.reward()
+        self.bind(ticket.ticket_id, job_id)
+        if not ticket.future.done():
+            ticket.future.set_result(job_id)
+
+    def stats(self) -> Dict:
+        return {
+            "queued": len(self._queue),
+            "rate_per_sec": round(self.bucket.rate, 3),
+            "tokens": round(self.bucket.tokens, 3),
+            "paused_for_sec": round(max(0.0, self.bucket.paused_until - time.monotonic()), 3),
+            "dispatched": self.dispatched,
+            "throttled": self.throttled,
+            "rejected": self.rejected,
+        }
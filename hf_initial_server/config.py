@@ -1,4 +1,5 @@
 # app/config.py
+from pydantic import model_validator
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
 class Settings(BaseSettings):
@@ -7,13 +8,78 @@ class Settings(BaseSettings):
     DEFAULT_MODEL: str = "minimax-t2v"      
     DEFAULT_RESOLUTION: str = "768"
     DEFAULT_LANGUAGE: str = "en"
-    PROVIDER: str = "higgsfield"
+    PROVIDER: str = "higgsfield"           # higgsfield | fake
+    # несколько маршрутов: "name=kind:model,..." (например "minimax=higgsfield:minimax-t2v,kling=higgsfield:kling-t2v");
+    # пусто — единственный маршрут PROVIDER с DEFAULT_MODEL
+    PROVIDER_ROUTES: str = ""
+    ROUTER_EXPLORE: float = 0.05
+    ROUTER_COOLDOWN_SEC: float = 30.0
     HIGGSFIELD_BASE_URL: str = "https://platform.higgsfield.ai"
-    HIGGSFIELD_API_KEY: str
-    HIGGSFIELD_API_SECRET: str
+    # обязательны, если хоть один маршрут идёт в higgsfield (без них не стартуем); PROVIDER=fake — не нужны
+    HIGGSFIELD_API_KEY: str = ""
+    HIGGSFIELD_API_SECRET: str = ""
+    # PROVIDER=fake: локальная имитация без сети (медианы задержек, доли ошибок)
+    FAKE_SUBMIT_LATENCY_SEC: float = 0.2
+    FAKE_STATUS_LATENCY_SEC: float = 0.05
+    FAKE_QUEUE_TIME_SEC: float = 2.0
+    FAKE_COMPLETION_TIME_SEC: float = 20.0
+    FAKE_LATENCY_SIGMA: float = 0.5
+    FAKE_SUBMIT_FAILURE_RATE: float = 0.0
+    FAKE_JOB_FAILURE_RATE: float = 0.0
     REQUEST_TIMEOUT: float = 60.0
+    HTTP2_ENABLED: bool = False
+    HTTP_MAX_CONNECTIONS: int = 100
+    HTTP_MAX_KEEPALIVE_CONNECTIONS: int = 20
+    HTTP_KEEPALIVE_EXPIRY: float = 30.0
     MAX_SYNC_WAIT_SEC: int = 20
+    SYNC_POLL_MIN_SEC: float = 1.0
+    SYNC_POLL_MAX_SEC: float = 5.0
+    PUBLIC_BASE_URL: str = ""               # пусто — webhook'и не регистрируются
+    WEBHOOK_SECRET: str = ""                # пусто — webhook'и выключены (приём без секрета небезопасен)
+    STATUS_POLL_FALLBACK_SEC: float = 15.0
+    STATUS_CACHE_TTL_SEC: float = 3.0
+    STREAM_POLL_MIN_SEC: float = 2.0
+    STREAM_POLL_MAX_SEC: float = 15.0
+    STREAM_MAX_SEC: float = 900.0
+    LONG_POLL_MAX_SEC: float = 60.0
+    STATUS_STORE_MAX_ENTRIES: int = 10000
+    BATCH_MAX_ITEMS: int = 500
+    BATCH_SUBMIT_CONCURRENCY: int = 8
+    BULK_STATUS_MAX_IDS: int = 200
+    BULK_STATUS_CONCURRENCY: int = 16
+    DEDUPE_ENABLED: bool = True
+    DEDUPE_DB_PATH: str = "./data/dedupe.sqlite3"
+    DEDUPE_REUSE_WINDOW_SEC: float = 3600.0
+    DEDUPE_INFLIGHT_MAX_SEC: float = 1800.0
+    ADMISSION_RATE_PER_SEC: float = 2.0
+    ADMISSION_BURST: int = 5
+    ADMISSION_MIN_RATE_PER_SEC: float = 0.1
+    ADMISSION_MAX_QUEUE: int = 1000
+    ADMISSION_MAX_RETRIES: int = 5
+    ADMISSION_WAIT_SEC: float = 5.0
+    RESULT_CACHE_DIR: str = "./data/results"
+    RESULT_CACHE_MAX_BYTES: int = 2 * 1024 ** 3
+    # /result проксирует только https-ссылки с этих хостов (и их поддоменов), в т.ч. после редиректов
+    RESULT_ALLOWED_HOSTS: str = "higgsfield.ai,cloudfront.net"
+    # разрешить и http-ссылки с этих хостов — только для тестов с tools/fake_higgsfield.py
+    RESULT_ALLOW_HTTP: bool = False
+    LEDGER_DB_PATH: str = "./data/jobs.sqlite3"
+    LEDGER_TTL_SEC: float = 30 * 24 * 3600.0
+    LEDGER_COMPACT_INTERVAL_SEC: float = 3600.0
+    HEDGE_MAX: int = 4
+    HEDGE_CANCEL_LOSERS: bool = True
+    GZIP_MIN_SIZE: int = 1024
     CORS_ALLOW_ORIGINS: str = "*"
     model_config = SettingsConfigDict(env_file=".env", env_file_encoding="utf-8")
 
+    @model_validator(mode="after")
+    def _require_higgsfield_credentials(self) -> "Settings":
+        # вид провайдера в маршруте "name=kind:model" — между "=" и ":"
+        kinds = {item.rpartition("=")[2].partition(":")[0].strip() for item in self.PROVIDER_ROUTES.split(",") if item.strip()}
+        if "higgsfield" in (kinds or {self.PROVIDER}):
+            missing = [k for k in ("HIGGSFIELD_API_KEY", "HIGGSFIELD_API_SECRET") if not getattr(self, k)]
+            if missing:
+                raise ValueError(f"{', '.join(missing)} required for the higgsfield provider (or set PROVIDER=fake)")
+        return self
+
 settings = Settings()
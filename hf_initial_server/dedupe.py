@@ -0,0 +1,133 @@
+import asyncio
+import hashlib
+import json
+import time
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+import db
+from status_store import StatusEntry
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS fingerprints (
+    fp          TEXT PRIMARY KEY,
+    job_id      TEXT NOT NULL,
+    status      TEXT NOT NULL DEFAULT 'queued',
+    created_at  REAL NOT NULL,
+    finished_at REAL
+);
+CREATE INDEX IF NOT EXISTS fingerprints_job_id ON fingerprints(job_id);
+CREATE INDEX IF NOT EXISTS fingerprints_created_at ON fingerprints(created_at);
+"""
+
+
+def fingerprint(prompt: str, **params: Any) -> str:
+    """Отпечаток запроса: нормализованный промпт + параметры генерации."""
+    norm = " ".join(prompt.split()).casefold()
+    payload = json.dumps({"prompt": norm, **params}, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class DedupeIndex:
+    """Индекс отпечаток → job_id, чтобы не платить за одинаковые генерации дважды.
+
+    Одинаковый запрос, пока job в работе, присоединяется к нему; успешный
+    результат переиспользуется в течение reuse_window_sec. Хранится в SQLite.
+    status — свежий статус job'а (кэш статусов): перед присоединением проверяем, что job
+    не упал, даже если его никто не опрашивал.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        reuse_window_sec: float,
+        inflight_max_sec: float,
+        status: Optional[Callable[[str], Awaitable[StatusEntry]]] = None,
+    ):
+        self.reuse_window_sec = reuse_window_sec
+        self.inflight_max_sec = inflight_max_sec
+        self.status = status
+        self._db = db.connect(path)
+        self._db.executescript(_SCHEMA)
+        self._pending: Dict[str, asyncio.Task] = {}
+        self.joined = 0
+        self.reused = 0
+
+    def lookup(self, fp: str) -> Optional[Tuple[str, str]]:
+        """Вернёт (job_id, "joined"|"reused") для подходящего существующего job'а."""
+        row = self._db.execute(
+            "SELECT job_id, status, created_at, finished_at FROM fingerprints WHERE fp = ?", (fp,)
+        ).fetchone()
+        if row is None:
+            return None
+        now = time.time()
+        if row["status"] == "succeeded":
+            if now - (row["finished_at"] or row["created_at"]) <= self.reuse_window_sec:
+                return row["job_id"], "reused"
+        elif row["status"] != "failed":
+            if now - row["created_at"] <= self.inflight_max_sec:
+                return row["job_id"], "joined"
+        return None
+
+    async def submit(self, fp: str, submit: Callable[[], Awaitable[str]]) -> Tuple[str, Optional[str]]:
+        """Вернёт (job_id, dedupe), где dedupe — None для нового job'а, иначе "joined"|"reused"."""
+        found = self.lookup(fp)
+        if found is not None and found[1] == "joined" and self.status is not None:
+            try:
+                entry = await self.status(found[0])
+            except Exception:
+                entry = None  # статус недоступен — присоединяемся, как раньше
+            if entry is not None and entry.status == "failed":
+                found = None
+            elif entry is not None and entry.status == "succeeded":
+                found = found[0], "reused"
+        if found is not None:
+            job_id, how = found
+            if how == "joined":
+                self.joined += 1
+            else:
+                self.reused += 1
+            return job_id, how
+
+        task = self._pending.get(fp)
+        if task is not None:
+            # такой же запрос прямо сейчас отправляется — ждём его job_id
+            self.joined += 1
+            return await asyncio.shield(task), "joined"
+
+        task = asyncio.ensure_future(submit())
+        self._pending[fp] = task
+        # запись — по завершении самой отправки: отмена первого клиента её не теряет
+        task.add_done_callback(lambda t: self._settle(fp, t))
+        return await asyncio.shield(task), None
+
+    def _settle(self, fp: str, task: asyncio.Task) -> None:
+        if self._pending.get(fp) is task:
+            del self._pending[fp]
+        if not task.cancelled() and task.exception() is None:
+            self.record(fp, task.result())
+
+    def record(self, fp: str, job_id: str) -> None:
+        now = time.time()
+        self._db.execute(
+            "INSERT OR REPLACE INTO fingerprints (fp, job_id, status, created_at) VALUES (?, ?, 'queued', ?)",
+            (fp, job_id, now),
+        )
+        # переиспользование считается от finished_at: долгий job не теряет строку раньше срока
+        horizon = now - max(self.reuse_window_sec, self.inflight_max_sec)
+        self._db.execute("DELETE FROM fingerprints WHERE COALESCE(finished_at, created_at) < ?", (horizon,))
+
+    def on_status(self, entry: StatusEntry) -> None:
+        """Подписчик StatusStore: фиксирует финальные статусы job'ов."""
+        if entry.terminal:
+            self._db.execute(
+                "UPDATE fingerprints SET status = ?, finished_at = ? WHERE job_id = ?",
+                (entry.status, time.time(), entry.job_id),
+            )
+
+    def stats(self) -> Dict:
+        return {
+            "joined": self.joined,
+            "reused": self.reused,
+            "pending": len(self._pending),
+            "reuse_window_sec": self.reuse_window_sec,
+        }
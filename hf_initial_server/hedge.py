@@ -0,0 +1,129 @@
+import asyncio
+import uuid
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Awaitable, Callable, Dict, List, Optional, Protocol, Tuple
+
+from status_store import StatusEntry
+
+HEDGE_PREFIX = "h-"
+
+
+class HedgeStore(Protocol):
+    def record_hedge(
+        self,
+        group_id: str,
+        members: List[str],
+        winner: Optional[str] = None,
+        submit_errors: Optional[List[str]] = None,
+    ) -> None: ...
+    def load_hedge(self, group_id: str) -> Optional[Tuple[List[str], Optional[str], List[str]]]: ...
+
+
+@dataclass
+class HedgeGroup:
+    group_id: str
+    members: List[str]
+    winner: Optional[str] = None
+    # участники, которых не удалось отправить: группа работает в неполном составе
+    submit_errors: List[str] = field(default_factory=list)
+
+
+class HedgeRegistry:
+    """Группы «хеджированных» генераций: один промпт, N seed'ов, побеждает первый succeeded.
+
+    Статус группы — статус победителя; пока его нет — processing/queued, failed —
+    когда ни один участник не жив (упал или не отвечает на опрос). Проигравшие отдаются on_win (например, на отмену).
+    Группы и победитель пишутся в store (журнал): h-… отвечает и после рестарта.
+    """
+
+    def __init__(
+        self,
+        on_win: Optional[Callable[[str, List[str]], None]] = None,
+        max_groups: int = 10000,
+        store: Optional[HedgeStore] = None,
+    ):
+        self.on_win = on_win
+        self.max_groups = max_groups
+        self.store = store
+        self._groups: "OrderedDict[str, HedgeGroup]" = OrderedDict()
+        self.wins_by_index: Dict[int, int] = {}
+
+    def create(self, members: List[str], submit_errors: Optional[List[str]] = None) -> str:
+        group = HedgeGroup(
+            group_id=f"{HEDGE_PREFIX}{uuid.uuid4().hex}",
+            members=list(members),
+            submit_errors=list(submit_errors or []),
+        )
+        if self.store is not None:
+            self.store.record_hedge(group.group_id, group.members, submit_errors=group.submit_errors)
+        self._add(group)
+        return group.group_id
+
+    def _add(self, group: HedgeGroup) -> None:
+        self._groups[group.group_id] = group
+        while len(self._groups) > self.max_groups:
+            self._groups.popitem(last=False)
+
+    def _get(self, group_id: str) -> Optional[HedgeGroup]:
+        group = self._groups.get(group_id)
+        if group is None and self.store is not None:
+            # группа до рестарта (или вытесненная из памяти) — из журнала
+            row = self.store.load_hedge(group_id)
+            if row is not None:
+                group = HedgeGroup(group_id=group_id, members=row[0], winner=row[1], submit_errors=row[2])
+                self._add(group)
+        return group
+
+    def is_group(self, job_id: str) -> bool:
+        return job_id.startswith(HEDGE_PREFIX) and self._get(job_id) is not None
+
+    async def resolve(
+        self,
+        group_id: str,
+        get: Callable[[str], Awaitable[StatusEntry]],
+    ) -> Tuple[str, Optional[str], Dict]:
+        group = self._get(group_id)
+        if group.winner is not None:
+            entry = await get(group.winner)
+            return entry.status, entry.video_url, self._meta(group)
+
+        results = await asyncio.gather(*(get(m) for m in group.members), return_exceptions=True)
+        entries = [r for r in results if isinstance(r, StatusEntry)]
+        for index, entry in enumerate(results):
+            if isinstance(entry, StatusEntry) and entry.status == "succeeded":
+                self._win(group, index)
+                return entry.status, entry.video_url, self._meta(group)
+
+        if not entries:
+            # все участники недоступны — пусть ошибка провайдера всплывёт как обычно
+            raise next(r for r in results if isinstance(r, BaseException))
+        if all(e.terminal for e in entries):
+            # succeeded уже разобран выше: остальные упали, а ошибка опроса без живых
+            # участников — тоже провал, иначе группа висит в queued вечно
+            return "failed", None, self._meta(group)
+        status = "processing" if any(e.status == "processing" for e in entries) else "queued"
+        return status, None, self._meta(group)
+
+    def _win(self, group: HedgeGroup, index: int) -> None:
+        group.winner = group.members[index]
+        if self.store is not None:
+            self.store.record_hedge(group.group_id, group.members, group.winner, group.submit_errors)
+        self.wins_by_index[index] = self.wins_by_index.get(index, 0) + 1
+        losers = [m for m in group.members if m != group.winner]
+        if self.on_win is not None and losers:
+            self.on_win(group.winner, losers)
+
+    @staticmethod
+    def _meta(group: HedgeGroup) -> Dict:
+        hedge = {"members": group.members, "winner": group.winner}
+        if group.submit_errors:
+            hedge["submit_errors"] = group.submit_errors
+        return {"hedge": hedge}
+
+    def stats(self) -> Dict:
+        return {
+            "groups": len(self._groups),
+            "decided": sum(1 for g in self._groups.values() if g.winner is not None),
+            "wins_by_index": dict(self.wins_by_index),
+        }
@@ -0,0 +1,198 @@
+import json
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+import db
+from status_store import StatusEntry, TERMINAL_STATUSES
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    job_id       TEXT PRIMARY KEY,
+    provider     TEXT NOT NULL,
+    prompt       TEXT NOT NULL,
+    params       TEXT NOT NULL,
+    status       TEXT NOT NULL,
+    result_url   TEXT,
+    meta         TEXT,
+    submitted_at REAL NOT NULL,
+    started_at   REAL,
+    finished_at  REAL,
+    updated_at   REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS jobs_status_submitted ON jobs(status, submitted_at);
+CREATE INDEX IF NOT EXISTS jobs_submitted ON jobs(submitted_at);
+CREATE INDEX IF NOT EXISTS jobs_updated ON jobs(updated_at);
+CREATE TABLE IF NOT EXISTS tickets (
+    ticket_id  TEXT PRIMARY KEY,
+    job_id     TEXT,
+    error      TEXT,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS tickets_updated ON tickets(updated_at);
+CREATE TABLE IF NOT EXISTS hedge_groups (
+    group_id   TEXT PRIMARY KEY,
+    members    TEXT NOT NULL,
+    winner     TEXT,
+    submit_errors TEXT,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS hedge_groups_updated ON hedge_groups(updated_at);
+"""
+
+
+class JobLedger:
+    """Журнал отправленных job'ов в SQLite: параметры, последний статус, ссылка и тайминги.
+
+    Финальные статусы из журнала отвечают на /status после рестарта без похода к провайдеру.
+    Здесь же тикеты очереди отправки (q-…) и группы хеджа (h-…): их id переживают рестарт.
+    """
+
+    def __init__(self, path: str):
+        self._db = db.connect(path)
+        self._db.executescript(_SCHEMA)
+        columns = {row["name"] for row in self._db.execute("PRAGMA table_info(hedge_groups)")}
+        if "submit_errors" not in columns:
+            # журнал, созданный до появления колонки
+            self._db.execute("ALTER TABLE hedge_groups ADD COLUMN submit_errors TEXT")
+
+    def record_submit(self, job_id: str, provider: str, prompt: str, params: Dict[str, Any]) -> None:
+        now = time.time()
+        self._db.execute(
+            "INSERT OR IGNORE INTO jobs (job_id, provider, prompt, params, status, submitted_at, updated_at)"
+            " VALUES (?, ?, ?, ?, 'queued', ?, ?)",
+            (job_id, provider, prompt, json.dumps(params, ensure_ascii=False), now, now),
+        )
+
+    def on_status(self, entry: StatusEntry) -> None:
+        """Подписчик StatusStore: записывает смену статуса и отметки времени."""
+        now = time.time()
+        self._db.execute(
+            "UPDATE jobs SET status = ?, result_url = COALESCE(?, result_url), meta = ?, updated_at = ?,"
+            " started_at = CASE WHEN started_at IS NULL AND ? != 'queued' THEN ? ELSE started_at END,"
+            " finished_at = CASE WHEN ? THEN ? ELSE finished_at END"
+            " WHERE job_id = ?",
+            (
+                entry.status, entry.video_url,
+                json.dumps(entry.meta, ensure_ascii=False) if entry.meta is not None else None, now,
+                entry.status, now,
+                entry.terminal, now,
+                entry.job_id,
+            ),
+        )
+
+    def load_entry(self, job_id: str) -> Optional[StatusEntry]:
+        """Финальный статус job'а из журнала (для ответа после рестарта)."""
+        row = self._db.execute(
+            "SELECT status, result_url, meta FROM jobs WHERE job_id = ?", (job_id,)
+        ).fetchone()
+        if row is None or row["status"] not in TERMINAL_STATUSES:
+            return None
+        return StatusEntry(
+            job_id=job_id,
+            status=row["status"],
+            video_url=row["result_url"],
+            meta=json.loads(row["meta"]) if row["meta"] else None,
+            source="ledger",
+        )
+
+    def record_ticket(self, ticket_id: str, job_id: Optional[str] = None, error: Optional[str] = None) -> None:
+        now = time.time()
+        self._db.execute(
+            "INSERT INTO tickets (ticket_id, job_id, error, created_at, updated_at) VALUES (?, ?, ?, ?, ?)"
+            " ON CONFLICT(ticket_id) DO UPDATE SET job_id = excluded.job_id, error = excluded.error,"
+            " updated_at = excluded.updated_at",
+            (ticket_id, job_id, error, now, now),
+        )
+
+    def load_ticket(self, ticket_id: str) -> Optional[Tuple[Optional[str], Optional[str]]]:
+        """(job_id, error) тикета; оба None — тикет стоял в очереди, когда процесс остановился."""
+        row = self._db.execute(
+            "SELECT job_id, error FROM tickets WHERE ticket_id = ?", (ticket_id,)
+        ).fetchone()
+        return (row["job_id"], row["error"]) if row is not None else None
+
+    def record_hedge(
+        self,
+        group_id: str,
+        members: List[str],
+        winner: Optional[str] = None,
+        submit_errors: Optional[List[str]] = None,
+    ) -> None:
+        now = time.time()
+        self._db.execute(
+            "INSERT INTO hedge_groups (group_id, members, winner, submit_errors, created_at, updated_at)"
+            " VALUES (?, ?, ?, ?, ?, ?)"
+            " ON CONFLICT(group_id) DO UPDATE SET winner = excluded.winner, updated_at = excluded.updated_at",
+            (group_id, json.dumps(members), winner, json.dumps(submit_errors or []), now, now),
+        )
+
+    def load_hedge(self, group_id: str) -> Optional[Tuple[List[str], Optional[str], List[str]]]:
+        """(members, winner, submit_errors) группы хеджа."""
+        row = self._db.execute(
+            "SELECT members, winner, submit_errors FROM hedge_groups WHERE group_id = ?", (group_id,)
+        ).fetchone()
+        if row is None:
+            return None
+        return json.loads(row["members"]), row["winner"], json.loads(row["submit_errors"] or "[]")
+
+    def provider_of(self, job_id: str) -> Optional[str]:
+        row = self._db.execute("SELECT provider FROM jobs WHERE job_id = ?", (job_id,)).fetchone()
+        return row["provider"] if row is not None else None
+
+    def list(
+        self,
+        status: Optional[str] = None,
+        since: Optional[float] = None,
+        until: Optional[float] = None,
+        limit: int = 100,
+        offset: int = 0,
+    ) -> List[Dict[str, Any]]:
+        where, args = [], []
+        if status:
+            where.append("status = ?")
+            args.append(status)
+        if since is not None:
+            where.append("submitted_at >= ?")
+            args.append(since)
+        if until is not None:
+            where.append("submitted_at < ?")
+            args.append(until)
+        sql = "SELECT job_id, provider, prompt, params, status, result_url, submitted_at, started_at, finished_at, updated_at FROM jobs"
+        if where:
+            sql += " WHERE " + " AND ".join(where)
+        sql += " ORDER BY submitted_at DESC LIMIT ? OFFSET ?"
+        rows = self._db.execute(sql, (*args, limit, offset)).fetchall()
+        return [{**dict(r), "params": json.loads(r["params"])} for r in rows]
+
+    def compact(self, ttl_sec: float) -> int:
+        """Удалить записи, не обновлявшиеся дольше ttl_sec. Вернёт число удалённых."""
+        cutoff = time.time() - ttl_sec
+        cur = self._db.execute("DELETE FROM jobs WHERE updated_at < ?", (cutoff,))
+        self._db.execute("DELETE FROM tickets WHERE updated_at < ?", (cutoff,))
+        self._db.execute("DELETE FROM hedge_groups WHERE updated_at < ?", (cutoff,))
+        return cur.rowcount
+
+    def stats(self, window_sec: float = 3600.0) -> Dict[str, Any]:
+        now = time.time()
+        by_status = {
+            r["status"]: r["n"]
+            for r in self._db.execute("SELECT status, COUNT(*) AS n FROM jobs GROUP BY status")
+        }
+        oldest = self._db.execute(
+            "SELECT MIN(submitted_at) AS t FROM jobs WHERE status IN ('queued', 'processing')"
+        ).fetchone()["t"]
+        recent = self._db.execute(
+            "SELECT COUNT(*) AS n, AVG(finished_at - submitted_at) AS avg_sec FROM jobs"
+            " WHERE status = 'succeeded' AND finished_at >= ?",
+            (now - window_sec,),
+        ).fetchone()
+        return {
+            "by_status": by_status,
+            "oldest_inflight_age_sec": round(now - oldest, 1) if oldest else None,
+            "succeeded_last_window": recent["n"],
+            "throughput_per_min": round(recent["n"] / (window_sec / 60), 3),
+            "avg_completion_sec": round(recent["avg_sec"], 1) if recent["avg_sec"] is not None else None,
+            "window_sec": window_sec,
+        }
@@ -1,11 +1,178 @@
-from fastapi import FastAPI, HTTPException
+import asyncio
+import hmac
+import json
+import math
+import random
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+
+from fastapi import Body, FastAPI, Header, HTTPException, Query, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.middleware.gzip import GZipMiddleware
+from fastapi.responses import ORJSONResponse, Response, StreamingResponse
 
-from schemas import GenerateRequest, GenerateResponse, StatusResponse
+from schemas import (
+    GenerateRequest, GenerateResponse, StatusResponse,
+    GenerateBatchRequest, GenerateBatchItem, GenerateBatchResponse,
+    BulkStatusRequest, BulkStatusItem, BulkStatusResponse,
+    JobRecord, JobsResponse,
+)
 from config import settings
-from providers.higgsfield import HiggsfieldProvider
+from providers import build_provider, parse_routes
+from providers.higgsfield import compact_job_set, parse_job_set
+from providers.router import ProviderRouter, Route
+from status_store import StatusEntry, StatusStore
+from status_cache import StatusCache
+from dedupe import DedupeIndex, fingerprint
+from admission import TICKET_PREFIX, AdmissionController, QueueFull
+from result_cache import HostNotAllowed, RangeNotSatisfiable, ResultCache, iter_file, parse_range
+from ledger import JobLedger
+from hedge import HEDGE_PREFIX, HedgeRegistry
+
+def _routes() -> List[Route]:
+    # маршруты генерации (PROVIDER_ROUTES) поверх реестра; провайдер одного типа общий на все его модели
+    instances: Dict[str, Any] = {}
+    routes = []
+    for name, kind, model in parse_routes(settings.PROVIDER_ROUTES, settings.PROVIDER):
+        if kind not in instances:
+            instances[kind] = build_provider(kind, settings)
+        routes.append(Route(name=name, provider=instances[kind], model=model))
+    return routes
+
+provider = ProviderRouter(
+    _routes(),
+    explore=settings.ROUTER_EXPLORE,
+    cooldown_sec=settings.ROUTER_COOLDOWN_SEC,
+    lookup=lambda job_id: ledger.provider_of(job_id),
+)
+
+def _webhook() -> Optional[dict]:
+    # без секрета webhook не регистрируем: кто угодно мог бы подсунуть статус и video_url;
+    # секрет идёт только в теле регистрации и в заголовке события, не в URL (логи, прокси)
+    if not settings.PUBLIC_BASE_URL or not settings.WEBHOOK_SECRET:
+        return None
+    url = f"{settings.PUBLIC_BASE_URL.rstrip('/')}/webhook/higgsfield"
+    return {"url": url, "secret": settings.WEBHOOK_SECRET}
+
+status_store = StatusStore(max_entries=settings.STATUS_STORE_MAX_ENTRIES)
+ledger = JobLedger(settings.LEDGER_DB_PATH)
+status_store.subscribe(ledger.on_status)
+status_store.subscribe(provider.on_status)
+# при включённых webhook'ах опрос — только подстраховка от потерянных событий, поэтому TTL длиннее
+status_cache = StatusCache(
+    status_store,
+    lambda job_id: _fetch_status(job_id),
+    ttl_sec=settings.STATUS_POLL_FALLBACK_SEC if _webhook() else settings.STATUS_CACHE_TTL_SEC,
+    loader=ledger.load_entry,
+)
+
+dedupe_index = DedupeIndex(
+    settings.DEDUPE_DB_PATH,
+    reuse_window_sec=settings.DEDUPE_REUSE_WINDOW_SEC,
+    inflight_max_sec=settings.DEDUPE_INFLIGHT_MAX_SEC,
+    status=lambda job_id: status_cache.get(job_id),
+)
+status_store.subscribe(dedupe_index.on_status)
+
+admission = AdmissionController(
+    rate=settings.ADMISSION_RATE_PER_SEC,
+    burst=settings.ADMISSION_BURST,
+    min_rate=settings.ADMISSION_MIN_RATE_PER_SEC,
+    max_queue=settings.ADMISSION_MAX_QUEUE,
+    max_retries=settings.ADMISSION_MAX_RETRIES,
+    store=ledger,
+)
+
+result_cache = ResultCache(
+    settings.RESULT_CACHE_DIR,
+    max_bytes=settings.RESULT_CACHE_MAX_BYTES,
+    timeout=settings.REQUEST_TIMEOUT,
+    allowed_hosts=[h.strip() for h in settings.RESULT_ALLOWED_HOSTS.split(",") if h.strip()],
+    allow_http=settings.RESULT_ALLOW_HTTP,
+)
+
+def _cancel_losers(winner: str, losers: List[str]) -> None:
+    # тикеты, ещё стоящие в очереди, просто снимаются с неё — до провайдера они не дойдут;
+    # у Higgsfield нет отмены — отправленные проигравшие игнорируются, провайдер с cancel() их отменит
+    if not settings.HEDGE_CANCEL_LOSERS:
+        return
+    cancel = getattr(provider, "cancel", None)
+    for job_id in losers:
+        if admission.is_ticket(job_id):
+            if admission.cancel(job_id):
+                continue
+            state = admission.ticket_state(job_id)
+            if not isinstance(state, str):
+                continue  # ещё отправляется или уже не отправился
+            job_id = state
+        entry = status_store.get(job_id)
+        if cancel is None or (entry is not None and entry.terminal):
+            continue
+        asyncio.ensure_future(cancel(job_id))
+
+hedges = HedgeRegistry(on_win=_cancel_losers, store=ledger)
+
+class UnknownJob(LookupError):
+    pass
+
+async def _fetch_status(job_id: str) -> Tuple[str, Optional[str], Dict]:
+    if hedges.is_group(job_id):
+        return await hedges.resolve(job_id, status_cache.get)
+    if job_id.startswith((TICKET_PREFIX, HEDGE_PREFIX)) and not admission.is_ticket(job_id):
+        # наш id, но ни в памяти, ни в журнале — не отдаём его провайдеру (это был бы 502)
+        raise UnknownJob(f"unknown job id {job_id}")
+    if not admission.is_ticket(job_id):
+        return await provider.status(job_id)
+    # тикет очереди: пока нет job_id — queued с позицией, потом статус настоящего job'а
+    state = admission.ticket_state(job_id)
+    if state is None:
+        return "queued", None, {"queue_position": admission.position(job_id)}
+    if isinstance(state, Exception):
+        return "failed", None, {"error": f"Provider submit failed: {state}"}
+    entry = await status_cache.get(state)
+    return entry.status, entry.video_url, entry.meta
+
+async def _compact_ledger() -> None:
+    while True:
+        try:
+            removed = ledger.compact(settings.LEDGER_TTL_SEC)
+            if removed:
+                print(f"[ledger] compacted {removed} jobs older than {settings.LEDGER_TTL_SEC}s")
+        except Exception as e:
+            print(f"[ledger] compaction warn: {e}")
+        await asyncio.sleep(settings.LEDGER_COMPACT_INTERVAL_SEC)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    admission.start()
+    compactor = asyncio.create_task(_compact_ledger())
+    yield
+    compactor.cancel()
+    await admission.stop()
+    await result_cache.aclose()
+    await provider.aclose()
+
+class SelectiveGZipMiddleware(GZipMiddleware):
+    """gzip для JSON-ответов; SSE и видео идут как есть (сжатие буферизует поток и ломает Range)."""
 
-app = FastAPI(title="Video Gen Service", version="1.0.0")
+    def __init__(self, app, minimum_size: int = 500, skip_suffixes: Tuple[str, ...] = ("/stream", ".mp4")):
+        super().__init__(app, minimum_size=minimum_size)
+        self.skip_suffixes = skip_suffixes
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "http" and scope["path"].endswith(self.skip_suffixes):
+            await self.app(scope, receive, send)
+            return
+        await super().__call__(scope, receive, send)
+
+app = FastAPI(
+    title="Video Gen Service",
+    version="1.0.0",
+    lifespan=lifespan,
+    default_response_class=ORJSONResponse,
+)
+
+app.add_middleware(SelectiveGZipMiddleware, minimum_size=settings.GZIP_MIN_SIZE)
 
 app.add_middleware(
     CORSMiddleware,
@@ -15,58 +182,411 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-provider = HiggsfieldProvider(
-    base_url=settings.HIGGSFIELD_BASE_URL,
-    api_key=settings.HIGGSFIELD_API_KEY,
-    api_secret=settings.HIGGSFIELD_API_SECRET,
-    timeout=settings.REQUEST_TIMEOUT
-)
-
 @app.get("/health")
 async def health():
     return {"ok": True}
 
-@app.post("/generate", response_model=GenerateResponse)
-async def generate(req: GenerateRequest):
+@app.get("/stats")
+async def stats():
+    return {
+        "provider": provider.stats(),
+        "status_cache": status_cache.stats(),
+        "dedupe": dedupe_index.stats(),
+        "admission": admission.stats(),
+        "result_cache": result_cache.stats(),
+        "ledger": ledger.stats(),
+        "hedge": hedges.stats(),
+    }
+
+@app.get("/jobs", response_model=JobsResponse)
+async def jobs(
+    status: Optional[str] = Query(None, description="queued|processing|succeeded|failed"),
+    since: Optional[float] = Query(None, description="submitted_at >= since (unix time)"),
+    until: Optional[float] = Query(None, description="submitted_at < until (unix time)"),
+    limit: int = Query(100, ge=1, le=1000),
+    offset: int = Query(0, ge=0),
+):
+    items = ledger.list(status=status, since=since, until=until, limit=limit, offset=offset)
+    return JobsResponse(items=[JobRecord(**i) for i in items], limit=limit, offset=offset)
+
+def _prompt_text(req: GenerateRequest) -> str:
     text = (req.user_prompt or "").strip()
     if len(text) < 3:
-        raise HTTPException(400, "user_prompt is too short")
- 
-    try:
-        job_id = await provider.submit(
-            prompt=text,
-            duration_s=settings.DEFAULT_DURATION_S,
-            aspect_ratio=settings.DEFAULT_ASPECT_RATIO,
-            seed=None,
-            model=settings.DEFAULT_MODEL,
-            enhance_prompt=True,
-            resolution=settings.DEFAULT_RESOLUTION,
-            webhook=None,
+        raise ValueError("user_prompt is too short")
+    return text
+
+async def _submit(
+    text: str,
+    seed: Optional[int] = None,
+    dedupe: bool = True,
+    priority: int = 0,
+    ticket_id: Optional[str] = None,
+) -> Tuple[str, Optional[str]]:
+    """Отправить генерацию. Вернёт (job_id, dedupe), dedupe — "joined"|"reused" для повтора."""
+    params = dict(
+        duration_s=settings.DEFAULT_DURATION_S,
+        aspect_ratio=settings.DEFAULT_ASPECT_RATIO,
+        seed=seed,
+        # модель маршрута, а не DEFAULT_MODEL: запросы к разным моделям не должны склеиваться
+        model=provider.pick_model(settings.DEFAULT_MODEL),
+        resolution=settings.DEFAULT_RESOLUTION,
+    )
+
+    async def submit() -> str:
+        job_id = await admission.submit(
+            lambda: provider.submit(prompt=text, enhance_prompt=True, webhook=_webhook(), **params),
+            priority=priority,
+            ticket_id=ticket_id,
         )
+        ledger.record_submit(job_id, provider.route_of(job_id) or provider.name, text, params)
+        status_store.put(StatusEntry(job_id=job_id, status="queued", source="submit"))
+        return job_id
+
+    if not (dedupe and settings.DEDUPE_ENABLED):
+        return await submit(), None
+    return await dedupe_index.submit(fingerprint(text, **params), submit)
+
+def _bind_ticket(ticket_id: str, task: asyncio.Task) -> None:
+    if task.cancelled():
+        return
+    exc = task.exception()
+    admission.bind(ticket_id, exc if exc is not None else task.result()[0])
+
+async def _generate_one(
+    text: str,
+    seed: Optional[int],
+    dedupe: bool,
+    priority: int,
+    wait: float,
+) -> Tuple[str, str, Optional[Dict]]:
+    """Вернёт (job_id, status, meta). Если отправка не уложилась в wait (очередь, троттлинг
+    провайдера) — вместо job_id отдаётся тикет очереди со статусом queued."""
+    ticket_id = admission.new_ticket_id()
+    task = asyncio.ensure_future(
+        _submit(text, seed=seed, dedupe=dedupe, priority=priority, ticket_id=ticket_id)
+    )
+    done, _ = await asyncio.wait({task}, timeout=wait)
+    if not done:
+        if not admission.is_ticket(ticket_id):
+            admission.bind(ticket_id, None)
+        task.add_done_callback(lambda t: _bind_ticket(ticket_id, t))
+        return ticket_id, "queued", {"queue_position": admission.position(ticket_id)}
+
+    job_id, dedupe_how = task.result()
+    entry = status_store.get(job_id)
+    return job_id, (entry.status if entry else "queued"), ({"dedupe": dedupe_how} if dedupe_how else None)
+
+async def _wait_finished(job_id: str, timeout: float) -> Optional[StatusEntry]:
+    """Опрашивать job с растущим интервалом до финального статуса; None — не успели за timeout."""
+    try:
+        async for entry in status_cache.watch(
+            job_id,
+            timeout=timeout,
+            min_interval=settings.SYNC_POLL_MIN_SEC,
+            max_interval=settings.SYNC_POLL_MAX_SEC,
+        ):
+            if entry.terminal:
+                return entry
+    except Exception:
+        # job уже отправлен — ошибка опроса не повод ронять запрос, клиент дождётся через /status
+        return None
+    return None
+
+async def _generate_hedged(
+    text: str,
+    seed: Optional[int],
+    n: int,
+    priority: int,
+    wait: float,
+) -> Tuple[str, str, Dict]:
+    """Отправить N генераций с разными seed'ами; вернёт id группы, статус которой — статус первого succeeded."""
+    seeds = [seed + i for i in range(n)] if seed is not None else random.sample(range(2 ** 31), n)
+    results = await asyncio.gather(
+        *(_generate_one(text, s, False, priority, wait=wait) for s in seeds),
+        return_exceptions=True,
+    )
+    members = [r[0] for r in results if not isinstance(r, BaseException)]
+    errors = [r for r in results if isinstance(r, BaseException)]
+    if not members:
+        # ни одна отправка не прошла — это ошибка запроса, а не пустая группа
+        raise errors[0]
+    # частичный отказ не скрываем: клиент видит, что хедж неполный
+    submit_errors = [f"seed {s}: {r}" for s, r in zip(seeds, results) if isinstance(r, BaseException)]
+    group_id = hedges.create(members, submit_errors)
+    meta = {"hedge": {"members": members, "winner": None}}
+    if submit_errors:
+        meta["hedge"]["submit_errors"] = submit_errors
+    return group_id, "queued", meta
+
+@app.post("/generate", response_model=GenerateResponse)
+async def generate(
+    req: GenerateRequest,
+    wait: bool = Query(False, description="Ждать готовое видео до MAX_SYNC_WAIT_SEC"),
+    hedge: int = Query(1, ge=1, description="Отправить N seed'ов и вернуть первый готовый результат"),
+    verbose: bool = Query(False, description="Полный документ job-set'а в meta"),
+):
+    try:
+        text = _prompt_text(req)
+    except ValueError as e:
+        raise HTTPException(400, str(e))
+
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + settings.MAX_SYNC_WAIT_SEC
+    submit_wait = min(settings.ADMISSION_WAIT_SEC, settings.MAX_SYNC_WAIT_SEC) if wait else settings.ADMISSION_WAIT_SEC
+    if hedge > settings.HEDGE_MAX:
+        raise HTTPException(400, f"hedge must be <= {settings.HEDGE_MAX}")
+    try:
+        if hedge > 1:
+            job_id, last_status, meta = await _generate_hedged(
+                text, req.seed, hedge, req.priority, wait=submit_wait
+            )
+        else:
+            job_id, last_status, meta = await _generate_one(
+                text, req.seed, req.dedupe, req.priority, wait=submit_wait
+            )
+    except QueueFull as e:
+        raise HTTPException(503, str(e), headers={"Retry-After": str(math.ceil(e.retry_after))})
     except Exception as e:
         raise HTTPException(502, f"Provider submit failed: {e}")
 
-    last_status, last_url, meta = "queued", None, None
+    if wait and last_status not in ("failed","succeeded") and not admission.is_ticket(job_id):
+        entry = await _wait_finished(job_id, timeout=max(0.0, deadline - loop.time()))
+        if entry is not None:
+            last_status, meta = entry.status, _meta(entry.meta, verbose)
+        else:
+            current = status_store.get(job_id)
+            last_status = current.status if current else last_status
 
     return GenerateResponse(
         job_id=job_id,
         status=last_status,
-        provider=provider.name,
+        provider=provider.route_of(job_id) or provider.name,
         video_url=(f"/result/{job_id}.mp4"),
         prompt_used=text if last_status in ("failed","succeeded") else None,
         meta=meta
     )
 
+@app.post("/generate/batch", response_model=GenerateBatchResponse)
+async def generate_batch(req: GenerateBatchRequest):
+    if len(req.items) > settings.BATCH_MAX_ITEMS:
+        raise HTTPException(413, f"too many items: {len(req.items)} > {settings.BATCH_MAX_ITEMS}")
+
+    sem = asyncio.Semaphore(settings.BATCH_SUBMIT_CONCURRENCY)
+    # общий бюджет ожидания на весь батч: что не успело уйти к провайдеру, возвращается тикетом очереди
+    deadline = asyncio.get_running_loop().time() + settings.ADMISSION_WAIT_SEC
+
+    async def one(index: int, item: GenerateRequest) -> GenerateBatchItem:
+        try:
+            text = _prompt_text(item)
+        except ValueError as e:
+            return GenerateBatchItem(index=index, error=str(e))
+        async with sem:
+            try:
+                job_id, status, meta = await _generate_one(
+                    text, item.seed, item.dedupe, item.priority,
+                    wait=max(0.0, deadline - asyncio.get_running_loop().time()),
+                )
+            except Exception as e:
+                return GenerateBatchItem(index=index, error=f"Provider submit failed: {e}")
+        return GenerateBatchItem(index=index, job_id=job_id, status=status, video_url=f"/result/{job_id}.mp4", meta=meta)
+
+    results = await asyncio.gather(*(one(i, item) for i, item in enumerate(req.items)))
+    failed = sum(1 for r in results if r.error)
+    return GenerateBatchResponse(
+        provider=provider.name,
+        submitted=len(results) - failed,
+        failed=failed,
+        results=results,
+    )
+
+def _meta(meta: Optional[Dict], verbose: bool) -> Optional[Dict]:
+    # полный документ job-set'а — только по ?verbose=1, по умолчанию короткая проекция
+    if verbose or not meta or "jobs" not in meta:
+        return meta
+    return compact_job_set(meta)
+
+def _status_response(job_id: str, entry: StatusEntry, verbose: bool = False) -> StatusResponse:
+    return StatusResponse(
+        job_id=job_id,
+        status=entry.status,
+        video_url=(f"/result/{job_id}.mp4" if entry.video_url else None),
+        meta=_meta(entry.meta, verbose)
+    )
+
+async def _bulk_status(ids: List[str], verbose: bool = False) -> BulkStatusResponse:
+    ids = list(dict.fromkeys(i.strip() for i in ids if i and i.strip()))
+    if not ids:
+        raise HTTPException(400, "no job ids given")
+    if len(ids) > settings.BULK_STATUS_MAX_IDS:
+        raise HTTPException(413, f"too many ids: {len(ids)} > {settings.BULK_STATUS_MAX_IDS}")
+
+    sem = asyncio.Semaphore(settings.BULK_STATUS_CONCURRENCY)
+
+    async def one(job_id: str) -> BulkStatusItem:
+        # финальные статусы из кэша отдаются без семафора и без похода к провайдеру
+        try:
+            if status_cache.cached(job_id) is not None:
+                entry = await status_cache.get(job_id)
+            else:
+                async with sem:
+                    entry = await status_cache.get(job_id)
+        except UnknownJob as e:
+            return BulkStatusItem(job_id=job_id, error=str(e))
+        except Exception as e:
+            return BulkStatusItem(job_id=job_id, error=f"Provider status failed: {e}")
+        return BulkStatusItem(**_status_response(job_id, entry, verbose).model_dump())
+
+    return BulkStatusResponse(results=await asyncio.gather(*(one(i) for i in ids)))
+
+@app.get("/status", response_model=BulkStatusResponse)
+async def status_bulk(
+    ids: str = Query(..., description="job_id через запятую"),
+    verbose: bool = Query(False, description="Полный документ job-set'а в meta"),
+):
+    return await _bulk_status(ids.split(","), verbose)
+
+@app.post("/status", response_model=BulkStatusResponse)
+async def status_bulk_post(
+    req: BulkStatusRequest,
+    verbose: bool = Query(False, description="Полный документ job-set'а в meta"),
+):
+    return await _bulk_status(req.ids, verbose)
+
 @app.get("/status/{job_id}", response_model=StatusResponse)
-async def status(job_id: str):
+async def status(
+    job_id: str,
+    wait: float = Query(0, ge=0, description="Long-poll: ждать до N секунд смены статуса"),
+    since: Optional[str] = Query(None, description="Статус, уже известный клиенту"),
+    verbose: bool = Query(False, description="Полный документ job-set'а в meta"),
+):
     try:
-        status, url, meta = await provider.status(job_id)
+        if not wait:
+            return _status_response(job_id, await status_cache.get(job_id), verbose)
+
+        baseline, entry = since, None
+        async for entry in status_cache.watch(
+            job_id,
+            timeout=min(wait, settings.LONG_POLL_MAX_SEC),
+            min_interval=settings.STREAM_POLL_MIN_SEC,
+            max_interval=settings.STREAM_POLL_MAX_SEC,
+        ):
+            baseline = baseline or entry.status
+            if entry.terminal or entry.status != baseline:
+                break
+    except UnknownJob as e:
+        raise HTTPException(404, str(e))
     except Exception as e:
         raise HTTPException(502, f"Provider status failed: {e}")
+    return _status_response(job_id, entry, verbose)
 
-    return StatusResponse(
-        job_id=job_id,
-        status=status,
-        video_url=(f"/result/{job_id}.mp4" if url else None),
-        meta=meta
-    )
\ No newline at end of file
+@app.get("/status/{job_id}/stream")
+async def status_stream(
+    job_id: str,
+    verbose: bool = Query(False, description="Полный документ job-set'а в meta"),
+):
+    async def events() -> AsyncIterator[str]:
+        try:
+            async for entry in status_cache.watch(
+                job_id,
+                timeout=settings.STREAM_MAX_SEC,
+                min_interval=settings.STREAM_POLL_MIN_SEC,
+                max_interval=settings.STREAM_POLL_MAX_SEC,
+            ):
+                yield f"event: status\ndata: {_status_response(job_id, entry, verbose).model_dump_json()}\n\n"
+        except UnknownJob as e:
+            yield f"event: error\ndata: {json.dumps({'detail': str(e)})}\n\n"
+        except Exception as e:
+            yield f"event: error\ndata: {json.dumps({'detail': f'Provider status failed: {e}'})}\n\n"
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+@app.api_route("/result/{job_id}.mp4", methods=["GET", "HEAD"])
+async def result(job_id: str, request: Request):
+    cached = result_cache.lookup(job_id)
+    if cached is None:
+        try:
+            entry = await status_cache.get(job_id)
+        except UnknownJob as e:
+            raise HTTPException(404, str(e))
+        except Exception as e:
+            raise HTTPException(502, f"Provider status failed: {e}")
+        if entry.status == "failed" or (entry.terminal and not entry.video_url):
+            raise HTTPException(404, f"no video for job {job_id} (status={entry.status})")
+        if not entry.video_url:
+            raise HTTPException(409, f"video is not ready yet (status={entry.status})")
+
+        if request.method == "HEAD":
+            # HEAD не запускает загрузку: размер берём из заголовков upstream
+            try:
+                size = await result_cache.head(entry.video_url)
+            except HostNotAllowed as e:
+                raise HTTPException(502, f"Video host is not allowed: {e}")
+            except Exception as e:
+                raise HTTPException(502, f"Video head failed: {e}")
+            if size is None:
+                return Response(media_type="video/mp4", headers={"Accept-Ranges": "bytes"})
+            return _range_response(request, None, size)
+
+        try:
+            fill = await result_cache.fill(job_id, entry.video_url)
+        except HostNotAllowed as e:
+            raise HTTPException(502, f"Video host is not allowed: {e}")
+        except Exception as e:
+            raise HTTPException(502, f"Video download failed: {e}")
+        cached = result_cache.lookup(job_id) if fill.done else None
+        if cached is None and "range" not in request.headers:
+            # первый просмотр: отдаём поток следом за загрузкой в кэш
+            headers = {"Accept-Ranges": "bytes"}
+            if fill.total is not None:
+                headers["Content-Length"] = str(fill.total)
+            return StreamingResponse(fill.reader(), media_type="video/mp4", headers=headers)
+        if cached is None:
+            # для перемотки нужен весь файл — дожидаемся загрузки
+            await fill.wait_done()
+            cached = result_cache.lookup(job_id)
+            if cached is None:
+                raise HTTPException(502, "Video download failed")
+
+    return _range_response(request, *cached)
+
+def _range_response(request: Request, path: Optional[str], size: int) -> Response:
+    """Ответ на GET/HEAD с учётом Range; path=None — только заголовки (HEAD)."""
+    try:
+        byte_range = parse_range(request.headers.get("range"), size)
+    except RangeNotSatisfiable:
+        return Response(status_code=416, headers={"Content-Range": f"bytes */{size}"})
+
+    start, end = byte_range or (0, size - 1)
+    headers = {"Accept-Ranges": "bytes", "Content-Length": str(end - start + 1)}
+    if byte_range is not None:
+        headers["Content-Range"] = f"bytes {start}-{end}/{size}"
+    status_code = 206 if byte_range is not None else 200
+    if request.method == "HEAD" or path is None:
+        return Response(status_code=status_code, media_type="video/mp4", headers=headers)
+    return StreamingResponse(iter_file(path, start, end), status_code=status_code, media_type="video/mp4", headers=headers)
+
+@app.post("/webhook/higgsfield")
+async def higgsfield_webhook(
+    payload: Dict[str, Any] = Body(...),
+    x_webhook_secret: Optional[str] = Header(None),
+):
+    if _webhook() is None:
+        raise HTTPException(403, "webhooks are disabled (PUBLIC_BASE_URL and WEBHOOK_SECRET required)")
+    if not hmac.compare_digest(x_webhook_secret or "", settings.WEBHOOK_SECRET):
+        raise HTTPException(401, "bad webhook secret")
+
+    # событие приходит либо целым job-set'ом (id — его id), либо отдельным job'ом:
+    # у job'а id свой, поэтому принимаем только явный job_set_id
+    job_id = payload.get("job_set_id") or (payload.get("id") if "jobs" in payload else None)
+    if not job_id:
+        raise HTTPException(400, "webhook payload has no job set id")
+    # meta хранится в форме job-set'а, как у опроса: клиенты читают meta.jobs[0]
+    doc = payload if "jobs" in payload else {"id": job_id, "jobs": [payload]}
+    status, url = parse_job_set(doc)
+
+    entry = status_store.put(StatusEntry(job_id=job_id, status=status, video_url=url, meta=doc, source="webhook"))
+    return {"ok": True, "job_id": job_id, "status": entry.status}
@@ -1,8 +1,12 @@
-from typing import Optional, Dict, Tuple, Protocol
+from typing import Any, Optional, Dict, Tuple, Protocol
 
 class T2VProvider(Protocol):
     name: str
-    async def submit(self, prompt: str, duration_s: int, aspect_ratio: str, seed: Optional[int]) -> str:
+    async def submit(self, prompt: str, duration_s: int, aspect_ratio: str, seed: Optional[int], **kwargs: Any) -> str:
         """Отправить задачу. Возвращает job_id."""
     async def status(self, job_id: str) -> Tuple[str, Optional[str], Dict]:
-        """Вернёт (status, video_url, meta). status: queued|processing|succeeded|failed"""
\ No newline at end of file
+        """Вернёт (status, video_url, meta). status: queued|processing|succeeded|failed"""
+    async def aclose(self) -> None:
+        """Закрыть соединения провайдера."""
+    def stats(self) -> Dict:
+        """Счётчики для /stats; calls — число обращений к upstream по видам."""
\ No newline at end of file
@@ -1 +1,73 @@
+from typing import Callable, Dict, List, Optional, Tuple
 
+from provider_base import T2VProvider
+from providers.fake import FakeProvider
+from providers.higgsfield import HiggsfieldProvider
+
+
+def _higgsfield(settings) -> HiggsfieldProvider:
+    return HiggsfieldProvider(
+        base_url=settings.HIGGSFIELD_BASE_URL,
+        api_key=settings.HIGGSFIELD_API_KEY,
+        api_secret=settings.HIGGSFIELD_API_SECRET,
+        timeout=settings.REQUEST_TIMEOUT,
+        http2=settings.HTTP2_ENABLED,
+        max_connections=settings.HTTP_MAX_CONNECTIONS,
+        max_keepalive_connections=settings.HTTP_MAX_KEEPALIVE_CONNECTIONS,
+        keepalive_expiry=settings.HTTP_KEEPALIVE_EXPIRY,
+    )
+
+
+def _fake(settings) -> FakeProvider:
+    return FakeProvider(
+        submit_latency_sec=settings.FAKE_SUBMIT_LATENCY_SEC,
+        status_latency_sec=settings.FAKE_STATUS_LATENCY_SEC,
+        queue_time_sec=settings.FAKE_QUEUE_TIME_SEC,
+        completion_time_sec=settings.FAKE_COMPLETION_TIME_SEC,
+        latency_sigma=settings.FAKE_LATENCY_SIGMA,
+        submit_failure_rate=settings.FAKE_SUBMIT_FAILURE_RATE,
+        job_failure_rate=settings.FAKE_JOB_FAILURE_RATE,
+    )
+
+
+# реестр реализаций T2VProvider: имя -> фабрика от config.Settings
+PROVIDERS: Dict[str, Callable[..., T2VProvider]] = {
+    "higgsfield": _higgsfield,
+    "fake": _fake,
+}
+
+
+def register_provider(kind: str, factory: Callable[..., T2VProvider]) -> None:
+    PROVIDERS[kind] = factory
+
+
+def build_provider(kind: str, settings) -> T2VProvider:
+    try:
+        factory = PROVIDERS[kind]
+    except KeyError:
+        raise ValueError(f"unknown provider {kind!r}, known: {', '.join(sorted(PROVIDERS))}")
+    return factory(settings)
+
+
+def parse_routes(spec: str, default_kind: str, default_model: Optional[str] = None) -> List[Tuple[str, str, Optional[str]]]:
+    """Разобрать PROVIDER_ROUTES: "name=kind:model,..." (name и model необязательны).
+
+    Пустая строка — один маршрут default_kind с моделью по умолчанию.
+    Вернёт [(name, kind, model)].
+    """
+    routes: List[Tuple[str, str, Optional[str]]] = []
+    for item in (spec or "").split(","):
+        item = item.strip()
+        if not item:
+            continue
+        name, _, target = item.rpartition("=")
+        kind, _, model = target.partition(":")
+        kind = kind.strip()
+        model = model.strip() or None
+        name = name.strip() or (f"{kind}:{model}" if model else kind)
+        if kind not in PROVIDERS:
+            raise ValueError(f"route {name!r}: unknown provider {kind!r}")
+        if any(r[0] == name for r in routes):
+            raise ValueError(f"duplicate route name {name!r}")
+        routes.append((name, kind, model))
+    return routes or [(default_kind, default_kind, default_model)]
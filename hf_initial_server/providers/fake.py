@@ -0,0 +1,143 @@
+import asyncio, random, time, uuid
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Optional, Tuple, Dict, Any
+
+import httpx
+
+from providers.higgsfield import parse_job_set
+
+
+def _lognormal(median: float, sigma: float) -> float:
+    """Случайная величина с заданной медианой и «тяжёлым хвостом» (sigma — разброс в log-пространстве)."""
+    if median <= 0:
+        return 0.0
+    return random.lognormvariate(0.0, sigma) * median if sigma > 0 else median
+
+
+@dataclass
+class FakeJob:
+    job_id: str
+    prompt: str
+    params: Dict[str, Any]
+    submitted_at: float
+    started_at: float
+    finished_at: float
+    fails: bool
+
+
+class FakeProvider:
+    """Локальная замена Higgsfield для нагрузочных тестов: ничего не тратит и не ходит в сеть.
+
+    Задержки распределены лог-нормально вокруг заданных медиан, часть отправок
+    отвечает 503 (submit_failure_rate), часть job'ов завершается ошибкой (job_failure_rate).
+    Документ job-set'а повторяет формат Higgsfield, так что его разбирает parse_job_set.
+    """
+
+    name = "fake"
+
+    def __init__(
+        self,
+        submit_latency_sec: float = 0.2,
+        status_latency_sec: float = 0.05,
+        queue_time_sec: float = 2.0,
+        completion_time_sec: float = 20.0,
+        latency_sigma: float = 0.5,
+        submit_failure_rate: float = 0.0,
+        job_failure_rate: float = 0.0,
+        video_base_url: str = "https://fake.invalid/videos",
+        max_jobs: int = 10000,
+    ):
+        self.submit_latency_sec = submit_latency_sec
+        self.status_latency_sec = status_latency_sec
+        self.queue_time_sec = queue_time_sec
+        self.completion_time_sec = completion_time_sec
+        self.latency_sigma = latency_sigma
+        self.submit_failure_rate = submit_failure_rate
+        self.job_failure_rate = job_failure_rate
+        self.video_base_url = video_base_url.rstrip("/")
+        # сверх max_jobs забываются самые старые: их статус — 404, как у протухшего job-set'а
+        self.max_jobs = max_jobs
+        self.jobs: "OrderedDict[str, FakeJob]" = OrderedDict()
+        self.calls = {"submit": 0, "status": 0}
+
+    async def aclose(self) -> None:
+        pass
+
+    async def submit(
+        self,
+        prompt: str,
+        duration_s: int,
+        aspect_ratio: str,
+        seed: Optional[int],
+        webhook: Optional[dict] = None,
+        **kwargs: Any,
+    ) -> str:
+        # webhook принимается ради совместимости с HiggsfieldProvider; вызывает его
+        # только HTTP-обёртка tools/fake_higgsfield.py
+        self.calls["submit"] += 1
+        await asyncio.sleep(_lognormal(self.submit_latency_sec, self.latency_sigma))
+        if random.random() < self.submit_failure_rate:
+            request = httpx.Request("POST", "fake://generate")
+            raise httpx.HTTPStatusError(
+                "Fake provider is overloaded",
+                request=request,
+                response=httpx.Response(503, headers={"Retry-After": "1"}, request=request),
+            )
+        now = time.time()
+        started = now + _lognormal(self.queue_time_sec, self.latency_sigma)
+        job = FakeJob(
+            job_id=str(uuid.uuid4()),
+            prompt=prompt,
+            params={"duration": duration_s, "aspect_ratio": aspect_ratio, "seed": seed, **kwargs},
+            submitted_at=now,
+            started_at=started,
+            finished_at=started + _lognormal(self.completion_time_sec, self.latency_sigma),
+            fails=random.random() < self.job_failure_rate,
+        )
+        self.jobs[job.job_id] = job
+        while len(self.jobs) > self.max_jobs:
+            self.jobs.popitem(last=False)
+        return job.job_id
+
+    async def cancel(self, job_id: str) -> None:
+        job = self.jobs.get(job_id)
+        if job is not None and time.time() < job.finished_at:
+            job.finished_at = time.time()
+            job.fails = True
+
+    def job_set_doc(self, job_id: str) -> Optional[Dict]:
+        """Документ job-set'а в формате Higgsfield на текущий момент (None — нет такого job'а)."""
+        job = self.jobs.get(job_id)
+        if job is None:
+            return None
+        now = time.time()
+        if now < job.started_at:
+            status, results = "queued", None
+        elif now < job.finished_at:
+            status, results = "processing", None
+        elif job.fails:
+            status, results = "failed", None
+        else:
+            status = "succeeded"
+            url = f"{self.video_base_url}/{job_id}.mp4"
+            results = {"raw": {"url": url, "type": "video"}, "min": {"url": url, "type": "video"}}
+        return {
+            "id": job_id,
+            "type": "text2video",
+            "created_at": job.submitted_at,
+            "params": {"prompt": job.prompt, **job.params},
+            "jobs": [{"id": job_id, "status": status, "results": results}],
+        }
+
+    async def status(self, job_id: str) -> Tuple[str, Optional[str], Dict]:
+        self.calls["status"] += 1
+        await asyncio.sleep(_lognormal(self.status_latency_sec, self.latency_sigma))
+        doc = self.job_set_doc(job_id)
+        if doc is None:
+            raise httpx.HTTPError(f"All status paths failed for job_id={job_id}: job set not found")
+        status, url = parse_job_set(doc)
+        return status, url, doc
+
+    def stats(self) -> Dict:
+        return {"name": self.name, "calls": dict(self.calls), "jobs": len(self.jobs)}
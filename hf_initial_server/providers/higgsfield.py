@@ -1,19 +1,108 @@
 import httpx, asyncio
 from typing import Optional, Tuple, Dict, Any, List
 
+def parse_job_set(data: Dict) -> Tuple[str, Optional[str]]:
+    """Свести документ job-set'а к (status, video_url). status: queued|processing|succeeded|failed"""
+    jobs = data.get("jobs", []) or []
+    statuses = [j.get("status","queued") for j in jobs]
+    if any(s == "failed" for s in statuses):
+        overall = "failed"
+    elif jobs and all(s == "succeeded" for s in statuses):
+        overall = "succeeded"
+    elif any(s in ("processing","running","queued") for s in statuses):
+        overall = "processing"
+    else:
+        overall = "queued"
+
+    video_url = None
+    for j in jobs:
+        res = j.get("results") or {}
+        raw = (res.get("raw") or {}).get("url")
+        mn  = (res.get("min") or {}).get("url")
+        video_url = raw or mn
+        if video_url: break
+    return overall, video_url
+
+
+def compact_job_set(data: Dict) -> Dict:
+    """Короткая проекция документа job-set'а для ответов: статус, ссылка, прогресс, тайминги и
+    ссылки задач (jobs[*].results.raw.url)."""
+    jobs = data.get("jobs", []) or []
+    overall, video_url = parse_job_set(data)
+    done = sum(1 for j in jobs if j.get("status") in ("succeeded", "completed", "failed"))
+    timings = {
+        k: data[k] for k in ("created_at", "started_at", "finished_at", "updated_at") if data.get(k) is not None
+    }
+    # jobs[*].results.raw.url оставляем: по нему ссылку читает hs_core_server (initial_generator.check_status)
+    compact_jobs = []
+    for j in jobs:
+        raw = ((j.get("results") or {}).get("raw") or {}).get("url")
+        compact_jobs.append({
+            "status": j.get("status"),
+            "results": {"raw": {"url": raw}} if raw else None,
+        })
+    return {
+        "status": overall,
+        "url": video_url,
+        "progress": {"done": done, "total": len(jobs)},
+        "timings": timings,
+        "jobs": compact_jobs,
+    }
+
+
 class HiggsfieldProvider:
     name = "higgsfield"
 
-    def __init__(self, base_url: str, api_key: str, api_secret: str, timeout: float = 60.0):
+    # маршруты job-set'а в порядке проверки; рабочий запоминается после первого успеха
+    STATUS_PATHS = ("/v1/job-sets/{job_id}", "/job-sets/{job_id}")
+
+    def __init__(
+        self,
+        base_url: str,
+        api_key: str,
+        api_secret: str,
+        timeout: float = 60.0,
+        http2: bool = False,
+        max_connections: int = 100,
+        max_keepalive_connections: int = 20,
+        keepalive_expiry: float = 30.0,
+    ):
         self.base_url = base_url.rstrip("/")
         self.api_key = api_key
         self.api_secret = api_secret
         self.timeout = timeout
+        self.http2 = http2
         self._headers = {
             "Content-Type": "application/json",
             "hf-api-key": self.api_key,
             "hf-secret": self.api_secret,
         }
+        self._limits = httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_keepalive_connections,
+            keepalive_expiry=keepalive_expiry,
+        )
+        self._client: Optional[httpx.AsyncClient] = None
+        self._status_path: Optional[str] = None
+        self.calls = {"submit": 0, "status": 0}
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        # один клиент на всё время жизни приложения: keep-alive пул вместо TCP+TLS на каждый запрос
+        if self._client is None or self._client.is_closed:
+            self._client = httpx.AsyncClient(
+                base_url=self.base_url,
+                headers=self._headers,
+                timeout=self.timeout,
+                limits=self._limits,
+                http2=self.http2,
+            )
+        return self._client
+
+    async def aclose(self) -> None:
+        if self._client is not None and not self._client.is_closed:
+            await self._client.aclose()
+        self._client = None
 
     async def submit(
         self,
@@ -28,7 +117,7 @@ class HiggsfieldProvider:
         **kwargs: Any,
     ) -> str:
         # точный маршрут из Playground: /generate/<model>
-        url = f"{self.base_url}/generate/{model}"
+        url = f"/generate/{model}"
         params: Dict[str, Any] = {
             "prompt": prompt,
             "duration": duration_s,
@@ -46,52 +135,38 @@ class HiggsfieldProvider:
         if webhook:
             payload["webhook"] = webhook
 
-        async with httpx.AsyncClient(timeout=self.timeout) as client:
-            r = await client.post(url, json=payload, headers=self._headers)
-            r.raise_for_status()
-            data = r.json()
-            job_set_id = data.get("id") or data.get("job_set_id")
-            if not job_set_id:
-                raise ValueError(f"Submit OK but no job_set id in response: {data}")
-            return job_set_id
+        self.calls["submit"] += 1
+        r = await self.client.post(url, json=payload)
+        r.raise_for_status()
+        data = r.json()
+        job_set_id = data.get("id") or data.get("job_set_id")
+        if not job_set_id:
+            raise ValueError(f"Submit OK but no job_set id in response: {data}")
+        return job_set_id
+
+    def _candidate_paths(self) -> List[str]:
+        if self._status_path:
+            return [self._status_path]
+        return list(self.STATUS_PATHS)
 
     async def status(self, job_id: str) -> Tuple[str, Optional[str], Dict]:
-        # пробуем несколько путей и ретраим 5xx (502 и т.п.)
-        candidate_paths = [
-            f"/v1/job-sets/{job_id}",
-            f"/job-sets/{job_id}",
-        ]
+        # пробуем несколько путей (пока рабочий не известен) и ретраим 5xx (502 и т.п.)
         last_exc: Exception | None = None
         for attempt in range(3):
-            for path in candidate_paths:
-                url = f"{self.base_url}{path}"
+            paths = self._candidate_paths()
+            not_found = 0
+            for path in paths:
                 try:
-                    async with httpx.AsyncClient(timeout=self.timeout) as client:
-                        r = await client.get(url, headers=self._headers)
-                        if r.status_code == 404:
-                            continue
-                        r.raise_for_status()
-                        data = r.json()
-
-                    jobs = data.get("jobs", []) or []
-                    statuses = [j.get("status","queued") for j in jobs]
-                    if any(s == "failed" for s in statuses):
-                        overall = "failed"
-                    elif jobs and all(s == "succeeded" for s in statuses):
-                        overall = "succeeded"
-                    elif any(s in ("processing","running","queued") for s in statuses):
-                        overall = "processing"
-                    else:
-                        overall = "queued"
-
-                    video_url = None
-                    for j in jobs:
-                        res = j.get("results") or {}
-                        raw = (res.get("raw") or {}).get("url")
-                        mn  = (res.get("min") or {}).get("url")
-                        video_url = raw or mn
-                        if video_url: break
+                    self.calls["status"] += 1
+                    r = await self.client.get(path.format(job_id=job_id))
+                    if r.status_code == 404:
+                        not_found += 1
+                        continue
+                    r.raise_for_status()
+                    data = r.json()
+                    self._status_path = path
 
+                    overall, video_url = parse_job_set(data)
                     return overall, video_url, data
 
                 except httpx.HTTPStatusError as e:
@@ -103,4 +178,11 @@ class HiggsfieldProvider:
                     last_exc = e
                     await asyncio.sleep(1.0 * (attempt + 1))
                     continue
+            if not_found == len(paths):
+                # все маршруты ответили 404 — job-set'а нет, ретраи не помогут
+                last_exc = LookupError("job set not found")
+                break
         raise httpx.HTTPError(f"All status paths failed for job_id={job_id}: {last_exc}")
+
+    def stats(self) -> Dict:
+        return {"name": self.name, "calls": dict(self.calls), "status_path": self._status_path}
@@ -0,0 +1,210 @@
+import random
+import time
+from collections import OrderedDict, deque
+from dataclasses import dataclass, field
+from typing import Any, Callable, Deque, Dict, List, Optional, Tuple
+
+from admission import retry_after_of
+from provider_base import T2VProvider
+from status_store import StatusEntry
+
+
+@dataclass
+class Route:
+    """Маршрут генерации: провайдер + модель. Несколько маршрутов могут делить один провайдер."""
+    name: str
+    provider: T2VProvider
+    model: Optional[str] = None
+    submits: int = 0
+    submit_failures: int = 0
+    succeeded: int = 0
+    failed: int = 0
+    success_rate: float = 1.0          # EWMA по отправкам и исходам job'ов, старт оптимистичный
+    paused_until: float = 0.0
+    latencies: Deque[float] = field(default_factory=lambda: deque(maxlen=50))
+
+    def latency_p50(self) -> Optional[float]:
+        if not self.latencies:
+            return None
+        ordered = sorted(self.latencies)
+        return ordered[len(ordered) // 2]
+
+
+@dataclass
+class _RoutedJob:
+    route: str
+    submitted_at: float
+    done: bool = False
+
+
+class ProviderRouter:
+    """T2VProvider поверх нескольких маршрутов: выбирает маршрут по доле успехов и времени до видео.
+
+    Оценка маршрута — ожидаемое время до успешного видео: p50 завершения / success_rate
+    (пока замеров нет — медиана по остальным маршрутам, т.е. новый маршрут не хуже среднего).
+    Ошибка отправки переключает на следующий маршрут и ставит текущий на паузу
+    (Retry-After или cooldown_sec); если упали все — наружу уходит последняя ошибка,
+    и её разбирает AdmissionController. С вероятностью explore первым берётся случайный
+    маршрут, чтобы статистика не застывала. Исходы job'ов приходят через on_status.
+    """
+
+    def __init__(
+        self,
+        routes: List[Route],
+        explore: float = 0.05,
+        cooldown_sec: float = 30.0,
+        alpha: float = 0.2,
+        lookup: Optional[Callable[[str], Optional[str]]] = None,
+        max_jobs: int = 100000,
+    ):
+        if not routes:
+            raise ValueError("at least one route is required")
+        self.routes: "OrderedDict[str, Route]" = OrderedDict((r.name, r) for r in routes)
+        self.name = routes[0].name if len(routes) == 1 else "router"
+        self.explore = explore
+        self.cooldown_sec = cooldown_sec
+        self.alpha = alpha
+        self.lookup = lookup
+        self.max_jobs = max_jobs
+        self.failovers = 0
+        self._jobs: "OrderedDict[str, _RoutedJob]" = OrderedDict()
+
+    def _providers(self) -> List[T2VProvider]:
+        return list({id(r.provider): r.provider for r in self.routes.values()}.values())
+
+    async def aclose(self) -> None:
+        for p in self._providers():
+            await p.aclose()
+
+    def _observe(self, route: Route, ok: bool) -> None:
+        route.success_rate += self.alpha * ((1.0 if ok else 0.0) - route.success_rate)
+
+    def score(self, route: Route) -> float:
+        """Ожидаемые секунды до успешного видео (меньше — лучше)."""
+        known = [p for p in (r.latency_p50() for r in self.routes.values()) if p is not None]
+        latency = route.latency_p50()
+        if latency is None:
+            latency = sorted(known)[len(known) // 2] if known else 1.0
+        return latency / max(route.success_rate, 0.05)
+
+    def order(self) -> List[Route]:
+        """Маршруты в порядке попыток: доступные по оценке, затем стоящие на паузе."""
+        now = time.time()
+        routes = list(self.routes.values())
+        # sorted стабилен: при равных оценках раньше идёт маршрут, объявленный раньше
+        ranked = sorted(routes, key=lambda r: (r.paused_until > now, self.score(r)))
+        available = [r for r in ranked if r.paused_until <= now]
+        if len(available) > 1 and random.random() < self.explore:
+            pick = random.choice(available[1:])
+            ranked.remove(pick)
+            ranked.insert(0, pick)
+        return ranked
+
+    def pick_model(self, default: str) -> str:
+        """Модель маршрута, которым пойдёт следующая отправка (для отпечатка дедупликации)."""
+        return self.order()[0].model or default
+
+    async def submit(
+        self,
+        prompt: str,
+        duration_s: int,
+        aspect_ratio: str,
+        seed: Optional[int],
+        **kwargs: Any,
+    ) -> str:
+        last_exc: Optional[Exception] = None
+        routes = self.order()
+        # заказанная модель (см. pick_model): фейловер только на маршруты с той же моделью,
+        # иначе job с отпечатком одной модели выполнился бы другой
+        model = kwargs.get("model")
+        same_model = [r for r in routes if r.model is None or r.model == model]
+        for attempt, route in enumerate(same_model or routes):
+            if attempt:
+                self.failovers += 1
+            params = dict(kwargs)
+            if route.model:
+                params["model"] = route.model
+            route.submits += 1
+            try:
+                job_id = await route.provider.submit(prompt, duration_s, aspect_ratio, seed, **params)
+            except Exception as e:
+                last_exc = e
+                route.submit_failures += 1
+                self._observe(route, False)
+                retry_after = retry_after_of(e)
+                route.paused_until = time.time() + (retry_after if retry_after is not None else self.cooldown_sec)
+                print(f"[router] submit via {route.name} failed: {e}")
+                continue
+            route.paused_until = 0.0
+            self._remember(job_id, route.name)
+            return job_id
+        raise last_exc
+
+    def _remember(self, job_id: str, route: str) -> None:
+        self._jobs[job_id] = _RoutedJob(route=route, submitted_at=time.time())
+        while len(self._jobs) > self.max_jobs:
+            self._jobs.popitem(last=False)
+
+    def route_of(self, job_id: str) -> Optional[str]:
+        job = self._jobs.get(job_id)
+        if job is not None:
+            return job.route
+        name = self.lookup(job_id) if self.lookup is not None else None
+        return name if name in self.routes else None
+
+    def _route_for(self, job_id: str) -> Route:
+        # job'ы до рестарта (или без записи в журнале) — на первый маршрут
+        name = self.route_of(job_id)
+        return self.routes[name] if name is not None else next(iter(self.routes.values()))
+
+    async def status(self, job_id: str) -> Tuple[str, Optional[str], Dict]:
+        return await self._route_for(job_id).provider.status(job_id)
+
+    async def cancel(self, job_id: str) -> None:
+        cancel = getattr(self._route_for(job_id).provider, "cancel", None)
+        if cancel is not None:
+            await cancel(job_id)
+
+    def on_status(self, entry: StatusEntry) -> None:
+        """Подписчик StatusStore: исход и время до финального статуса для маршрута job'а."""
+        job = self._jobs.get(entry.job_id)
+        if job is None or job.done or not entry.terminal:
+            return
+        job.done = True
+        route = self.routes[job.route]
+        ok = entry.status == "succeeded"
+        self._observe(route, ok)
+        if ok:
+            route.succeeded += 1
+            route.latencies.append(time.time() - job.submitted_at)
+        else:
+            route.failed += 1
+
+    def stats(self) -> Dict:
+        calls: Dict[str, int] = {}
+        for p in self._providers():
+            for k, v in (p.stats().get("calls") or {}).items():
+                calls[k] = calls.get(k, 0) + v
+        now = time.time()
+        return {
+            "name": self.name,
+            "calls": calls,
+            "failovers": self.failovers,
+            "routes": [
+                {
+                    "name": r.name,
+                    "provider": r.provider.name,
+                    "model": r.model,
+                    "submits": r.submits,
+                    "submit_failures": r.submit_failures,
+                    "succeeded": r.succeeded,
+                    "failed": r.failed,
+                    "success_rate": round(r.success_rate, 3),
+                    "latency_p50_sec": round(r.latency_p50(), 1) if r.latency_p50() is not None else None,
+                    "score": round(self.score(r), 2),
+                    "paused_for_sec": round(max(0.0, r.paused_until - now), 1),
+                }
+                for r in self.routes.values()
+            ],
+            "providers": [p.stats() for p in self._providers()],
+        }
@@ -0,0 +1,278 @@
+import asyncio
+import hashlib
+import os
+import re
+from collections import OrderedDict
+from typing import AsyncIterator, Dict, Iterable, Optional, Tuple
+
+import anyio
+import httpx
+
+CHUNK_SIZE = 256 * 1024
+
+_RANGE_RE = re.compile(r"^bytes=(\d*)-(\d*)$")
+
+
+class RangeNotSatisfiable(Exception):
+    pass
+
+
+class HostNotAllowed(Exception):
+    pass
+
+
+def host_allowed(url: httpx.URL, hosts: Iterable[str], allow_http: bool = False) -> bool:
+    """https (или http при allow_http) и хост из списка (или его поддомен)."""
+    host = (url.host or "").lower()
+    schemes = ("https", "http") if allow_http else ("https",)
+    return url.scheme in schemes and any(host == h or host.endswith("." + h) for h in hosts)
+
+
+def parse_range(header: Optional[str], size: int) -> Optional[Tuple[int, int]]:
+    """Разобрать одиночный Range: bytes=a-b | a- | -n. Вернёт (start, end) включительно или None."""
+    if not header:
+        return None
+    m = _RANGE_RE.match(header.strip())
+    if not m or not (m.group(1) or m.group(2)):
+        # несколько диапазонов и прочую экзотику отдаём целиком, как разрешает RFC 9110
+        return None
+    if m.group(1):
+        start = int(m.group(1))
+        if m.group(2) and int(m.group(2)) < start:
+            # bytes=5-3 синтаксически неверен — RFC 9110 велит игнорировать Range
+            return None
+        end = min(int(m.group(2)), size - 1) if m.group(2) else size - 1
+    else:
+        start = max(0, size - int(m.group(2)))
+        end = size - 1
+    if start >= size:
+        raise RangeNotSatisfiable(header)
+    return start, end
+
+
+async def iter_file(path: str, start: int, end: int) -> AsyncIterator[bytes]:
+    async with await anyio.open_file(path, "rb") as f:
+        await f.seek(start)
+        remaining = end - start + 1
+        while remaining > 0:
+            data = await f.read(min(CHUNK_SIZE, remaining))
+            if not data:
+                break
+            remaining -= len(data)
+            yield data
+
+
+class Fill:
+    """Скачивание одного видео в кэш; читатели могут идти следом за записью."""
+
+    def __init__(self, part_path: str):
+        self.part_path = part_path
+        self.total: Optional[int] = None
+        self.written = 0
+        self.done = False
+        self.error: Optional[Exception] = None
+        self.started = asyncio.Event()
+        self._progress = asyncio.Event()
+        open(part_path, "wb").close()
+
+    def notify(self) -> None:
+        self._progress.set()
+        self._progress = asyncio.Event()
+
+    async def wait_done(self) -> None:
+        while not self.done:
+            await self._progress.wait()
+
+    def reader(self) -> AsyncIterator[bytes]:
+        """Читать файл следом за загрузкой. Файл открывается сразу: дескриптор
+        переживает переименование .part → .mp4 по окончании загрузки."""
+        return self._follow(anyio.wrap_file(open(self.part_path, "rb")))
+
+    async def _follow(self, f: anyio.AsyncFile) -> AsyncIterator[bytes]:
+        async with f:
+            pos = 0
+            while True:
+                progress = self._progress
+                if pos < self.written:
+                    data = await f.read(min(CHUNK_SIZE, self.written - pos))
+                    pos += len(data)
+                    yield data
+                elif self.done:
+                    if self.error is not None:
+                        raise self.error
+                    return
+                else:
+                    await progress.wait()
+
+
+class ResultCache:
+    """LRU-кэш готовых видео на диске, ограниченный суммарным размером.
+
+    Первое обращение к видео скачивает его один раз (остальные ждут или читают
+    следом за загрузкой), дальше файл отдаётся локально.
+    """
+
+    def __init__(
+        self,
+        directory: str,
+        max_bytes: int,
+        timeout: float = 60.0,
+        allowed_hosts: Iterable[str] = (),
+        allow_http: bool = False,
+    ):
+        self.directory = os.path.abspath(directory)
+        self.max_bytes = max_bytes
+        self.timeout = timeout
+        self.allowed_hosts = tuple(h.lower() for h in allowed_hosts)
+        self.allow_http = allow_http
+        os.makedirs(self.directory, exist_ok=True)
+        self._client: Optional[httpx.AsyncClient] = None
+        self._index: "OrderedDict[str, int]" = OrderedDict()
+        self._fills: Dict[str, Fill] = {}
+        self.total_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._scan()
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        # отдельный клиент: заголовки с ключами Higgsfield не должны уходить на CDN
+        if self._client is None or self._client.is_closed:
+            # хук на каждый запрос: редирект на чужой/внутренний хост тоже отсекается
+            self._client = httpx.AsyncClient(
+                timeout=self.timeout,
+                follow_redirects=True,
+                event_hooks={"request": [self._check_host]},
+            )
+        return self._client
+
+    async def _check_host(self, request: httpx.Request) -> None:
+        if not host_allowed(request.url, self.allowed_hosts, self.allow_http):
+            raise HostNotAllowed(request.url.host or str(request.url))
+
+    async def aclose(self) -> None:
+        if self._client is not None and not self._client.is_closed:
+            await self._client.aclose()
+        self._client = None
+
+    def _scan(self) -> None:
+        files = []
+        for name in os.listdir(self.directory):
+            path = os.path.join(self.directory, name)
+            if name.endswith(".part"):
+                os.remove(path)
+            elif name.endswith(".mp4"):
+                st = os.stat(path)
+                files.append((st.st_mtime, name[:-4], st.st_size))
+        for _, key, size in sorted(files):
+            self._index[key] = size
+            self.total_bytes += size
+
+    @staticmethod
+    def key_for(job_id: str) -> str:
+        return hashlib.sha256(job_id.encode("utf-8")).hexdigest()[:40]
+
+    def path_for(self, key: str) -> str:
+        return os.path.join(self.directory, f"{key}.mp4")
+
+    def lookup(self, job_id: str) -> Optional[Tuple[str, int]]:
+        """Вернёт (path, size) закэшированного видео и отметит его как свежее."""
+        key = self.key_for(job_id)
+        size = self._index.get(key)
+        if size is None:
+            return None
+        path = self.path_for(key)
+        if not os.path.exists(path):
+            del self._index[key]
+            self.total_bytes -= size
+            return None
+        self._index.move_to_end(key)
+        os.utime(path)
+        self.hits += 1
+        return path, size
+
+    async def head(self, url: str) -> Optional[int]:
+        """Размер видео по заголовкам upstream, без загрузки в кэш."""
+        if not host_allowed(httpx.URL(url), self.allowed_hosts, self.allow_http):
+            raise HostNotAllowed(httpx.URL(url).host or url)
+        r = await self.client.head(url)
+        if r.status_code in (403, 405):
+            # подписанные ссылки часто подписаны только под GET: берём заголовки, тело не читаем
+            async with self.client.stream("GET", url) as r:
+                pass
+        r.raise_for_status()
+        length = r.headers.get("Content-Length", "")
+        return int(length) if length.isdigit() else None
+
+    async def fill(self, job_id: str, url: str) -> Fill:
+        """Начать (или присоединиться к) загрузке видео; вернётся после ответа upstream.
+
+        К моменту возврата загрузка могла уже закончиться — тогда fill.done и файл в кэше.
+        """
+        if not host_allowed(httpx.URL(url), self.allowed_hosts, self.allow_http):
+            raise HostNotAllowed(httpx.URL(url).host or url)
+        key = self.key_for(job_id)
+        fill = self._fills.get(key)
+        if fill is None:
+            self.misses += 1
+            fill = Fill(self.path_for(key) + ".part")
+            self._fills[key] = fill
+            asyncio.create_task(self._download(key, url, fill))
+        await fill.started.wait()
+        if fill.error is not None:
+            raise fill.error
+        return fill
+
+    async def _download(self, key: str, url: str, fill: Fill) -> None:
+        try:
+            async with self.client.stream("GET", url) as r:
+                r.raise_for_status()
+                length = r.headers.get("Content-Length", "")
+                fill.total = int(length) if length.isdigit() else None
+                fill.started.set()
+                async with await anyio.open_file(fill.part_path, "ab") as f:
+                    async for chunk in r.aiter_bytes(CHUNK_SIZE):
+                        await f.write(chunk)
+                        await f.flush()
+                        fill.written += len(chunk)
+                        fill.notify()
+            os.replace(fill.part_path, self.path_for(key))
+            self._add(key, fill.written)
+        except Exception as e:
+            fill.error = e
+            try:
+                os.remove(fill.part_path)
+            except OSError:
+                pass
+        finally:
+            fill.done = True
+            fill.started.set()
+            fill.notify()
+            self._fills.pop(key, None)
+
+    def _add(self, key: str, size: int) -> None:
+        old = self._index.pop(key, None)
+        if old is not None:
+            self.total_bytes -= old
+        self._index[key] = size
+        self.total_bytes += size
+        while self.total_bytes > self.max_bytes and len(self._index) > 1:
+            victim, victim_size = self._index.popitem(last=False)
+            self.total_bytes -= victim_size
+            self.evictions += 1
+            try:
+                os.remove(self.path_for(victim))
+            except OSError:
+                pass
+
+    def stats(self) -> Dict:
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "files": len(self._index),
+            "bytes": self.total_bytes,
+            "max_bytes": self.max_bytes,
+            "filling": len(self._fills),
+        }
@@ -1,8 +1,11 @@
 from pydantic import BaseModel, Field
-from typing import Optional, Literal, Dict
+from typing import Optional, Literal, Dict, List, Any
 
 class GenerateRequest(BaseModel):
     user_prompt: str = Field(..., example="A black Mustang races across the desert at golden hour")
+    seed: Optional[int] = None
+    dedupe: bool = Field(True, description="Переиспользовать job с тем же промптом и параметрами")
+    priority: int = Field(0, description="Приоритет в очереди отправки (больше — раньше)")
 
 class GenerateResponse(BaseModel):
     job_id: str
@@ -17,3 +20,50 @@ class StatusResponse(BaseModel):
     status: Literal["queued","processing","succeeded","failed"]
     video_url: Optional[str] = None
     meta: Optional[Dict] = None
+
+class GenerateBatchRequest(BaseModel):
+    items: List[GenerateRequest] = Field(..., min_length=1)
+
+class GenerateBatchItem(BaseModel):
+    index: int
+    job_id: Optional[str] = None
+    status: Optional[Literal["queued","processing","succeeded","failed"]] = None
+    video_url: Optional[str] = None
+    meta: Optional[Dict] = None
+    error: Optional[str] = None
+
+class GenerateBatchResponse(BaseModel):
+    provider: str
+    submitted: int
+    failed: int
+    results: List[GenerateBatchItem]
+
+class BulkStatusRequest(BaseModel):
+    ids: List[str] = Field(..., min_length=1)
+
+class BulkStatusItem(BaseModel):
+    job_id: str
+    status: Optional[Literal["queued","processing","succeeded","failed"]] = None
+    video_url: Optional[str] = None
+    meta: Optional[Dict] = None
+    error: Optional[str] = None
+
+class BulkStatusResponse(BaseModel):
+    results: List[BulkStatusItem]
+
+class JobRecord(BaseModel):
+    job_id: str
+    provider: str
+    prompt: str
+    params: Dict[str, Any]
+    status: str
+    result_url: Optional[str] = None
+    submitted_at: float
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+    updated_at: float
+
+class JobsResponse(BaseModel):
+    items: List[JobRecord]
+    limit: int
+    offset: int
@@ -0,0 +1,113 @@
+import asyncio
+from typing import AsyncIterator, Awaitable, Callable, Dict, Optional, Tuple
+
+from status_store import StatusEntry, StatusStore
+
+StatusFetch = Callable[[str], Awaitable[Tuple[str, Optional[str], Dict]]]
+StatusLoader = Callable[[str], Optional[StatusEntry]]
+
+
+class StatusCache:
+    """TTL-кэш статусов поверх StatusStore.
+
+    Финальные статусы не протухают, промежуточные живут ttl_sec. Одновременные
+    промахи по одному job_id объединяются в один запрос к провайдеру.
+    """
+
+    def __init__(
+        self,
+        store: StatusStore,
+        fetch: StatusFetch,
+        ttl_sec: float,
+        loader: Optional[StatusLoader] = None,
+    ):
+        self.store = store
+        self.fetch = fetch
+        self.ttl_sec = ttl_sec
+        # loader — постоянное хранилище (журнал job'ов), куда смотрим до похода к провайдеру
+        self.loader = loader
+        self._inflight: Dict[str, asyncio.Task] = {}
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+
+    def cached(self, job_id: str) -> Optional[StatusEntry]:
+        entry = self.store.get(job_id)
+        if entry is None and self.loader is not None:
+            loaded = self.loader(job_id)
+            if loaded is not None:
+                entry = self.store.put(loaded, notify=False)
+        if entry is not None and (entry.terminal or entry.age < self.ttl_sec):
+            return entry
+        return None
+
+    async def get(self, job_id: str) -> StatusEntry:
+        entry = self.cached(job_id)
+        if entry is not None:
+            self.hits += 1
+            return entry
+
+        task = self._inflight.get(job_id)
+        if task is None:
+            self.misses += 1
+            task = asyncio.ensure_future(self._refresh(job_id))
+            self._inflight[job_id] = task
+            task.add_done_callback(lambda t: self._done(job_id, t))
+        else:
+            self.coalesced += 1
+        # shield: отключившийся клиент не должен отменять общий запрос остальным
+        return await asyncio.shield(task)
+
+    async def watch(
+        self,
+        job_id: str,
+        timeout: Optional[float] = None,
+        min_interval: float = 1.0,
+        max_interval: float = 15.0,
+    ) -> AsyncIterator[StatusEntry]:
+        """Отдавать запись при каждой смене статуса, пока он не станет финальным или не истечёт timeout.
+
+        Между проверками интервал растёт от min_interval до max_interval; запись
+        из webhook'а будит ожидание сразу.
+        """
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout if timeout is not None else None
+        interval = min_interval
+        last_status = None
+        while True:
+            entry = await self.get(job_id)
+            if entry.status != last_status:
+                last_status = entry.status
+                interval = min_interval
+                yield entry
+            if entry.terminal:
+                return
+            delay = interval
+            if deadline is not None:
+                delay = min(delay, deadline - loop.time())
+                if delay <= 0:
+                    return
+            await self.store.wait_changed(job_id, delay)
+            interval = min(interval * 1.6, max_interval)
+
+    async def _refresh(self, job_id: str) -> StatusEntry:
+        status, url, meta = await self.fetch(job_id)
+        return self.store.put(StatusEntry(job_id=job_id, status=status, video_url=url, meta=meta))
+
+    def _done(self, job_id: str, task: asyncio.Task) -> None:
+        if self._inflight.get(job_id) is task:
+            del self._inflight[job_id]
+        if not task.cancelled():
+            task.exception()  # помечаем ошибку как полученную, даже если все ожидающие ушли
+
+    def stats(self) -> Dict:
+        lookups = self.hits + self.misses + self.coalesced
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else None,
+            "inflight": len(self._inflight),
+            "entries": len(self.store),
+            "ttl_sec": self.ttl_sec,
+        }
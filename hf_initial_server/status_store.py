@@ -0,0 +1,86 @@
+import asyncio
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Optional
+
+TERMINAL_STATUSES = ("succeeded", "failed")
+
+
+@dataclass
+class StatusEntry:
+    job_id: str
+    status: str
+    video_url: Optional[str] = None
+    meta: Optional[Dict] = None
+    source: str = "poll"  # poll | webhook | submit
+    updated_at: float = field(default_factory=time.monotonic)
+
+    @property
+    def terminal(self) -> bool:
+        return self.status in TERMINAL_STATUSES
+
+    @property
+    def age(self) -> float:
+        return time.monotonic() - self.updated_at
+
+
+class StatusStore:
+    """Последние известные статусы job-set'ов (webhook'и + результаты опроса)."""
+
+    def __init__(self, max_entries: int = 10000):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, StatusEntry]" = OrderedDict()
+        self._changed: Dict[str, asyncio.Event] = {}
+        self._waiters: Dict[str, int] = {}
+        self._listeners: List[Callable[[StatusEntry], None]] = []
+
+    def subscribe(self, listener: Callable[[StatusEntry], None]) -> None:
+        """Вызывать listener(entry) при каждой смене статуса job'а."""
+        self._listeners.append(listener)
+
+    def get(self, job_id: str) -> Optional[StatusEntry]:
+        return self._entries.get(job_id)
+
+    def put(self, entry: StatusEntry, notify: bool = True) -> StatusEntry:
+        """Записать статус. notify=False — без подписчиков (запись восстановлена из журнала)."""
+        current = self._entries.get(entry.job_id)
+        # запоздавший опрос/событие не должен откатывать финальный статус
+        if current is not None and current.terminal and not entry.terminal:
+            return current
+        self._entries[entry.job_id] = entry
+        self._entries.move_to_end(entry.job_id)
+        if notify and (current is None or current.status != entry.status):
+            for listener in self._listeners:
+                listener(entry)
+        while len(self._entries) > self.max_entries:
+            evicted, _ = self._entries.popitem(last=False)
+            self._release(evicted)
+        self._release(entry.job_id)
+        return entry
+
+    def _release(self, job_id: str) -> None:
+        """Разбудить ждущих job_id и забыть их событие."""
+        event = self._changed.pop(job_id, None)
+        if event is not None:
+            event.set()
+
+    async def wait_changed(self, job_id: str, timeout: float) -> bool:
+        """Ждать следующей записи по job_id (например, из webhook'а) не дольше timeout."""
+        event = self._changed.setdefault(job_id, asyncio.Event())
+        self._waiters[job_id] = self._waiters.get(job_id, 0) + 1
+        try:
+            await asyncio.wait_for(event.wait(), timeout)
+            return True
+        except asyncio.TimeoutError:
+            return False
+        finally:
+            # последний ушедший убирает событие, иначе оно висит до следующего put
+            left = self._waiters.pop(job_id) - 1
+            if left:
+                self._waiters[job_id] = left
+            elif self._changed.get(job_id) is event:
+                del self._changed[job_id]
+
+    def __len__(self) -> int:
+        return len(self._entries)
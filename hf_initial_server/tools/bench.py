@@ -0,0 +1,162 @@
+"""Нагрузочный прогон /generate + /status с заданным RPS.
+
+Каждую 1/RPS секунды запускается «клиент»: POST /generate, затем GET /status/{job_id}
+каждые --poll-interval секунд до финального статуса. В конце печатаются p50/p95/p99
+по каждому маршруту, доля ошибок, время до готового видео и число запросов к
+провайдеру на job (по разнице /stats сервиса до и после прогона).
+
+    cd hf_initial_server
+    PROVIDER=fake FAKE_COMPLETION_TIME_SEC=10 uvicorn main:app --port 8000
+    python -m tools.bench --base-url http://localhost:8000 --rps 20 --duration 60
+"""
+import argparse
+import asyncio
+import json
+import random
+import time
+from collections import defaultdict
+from typing import Dict, List, Optional
+
+import httpx
+
+
+def percentile(values: List[float], q: float) -> Optional[float]:
+    if not values:
+        return None
+    ordered = sorted(values)
+    idx = min(len(ordered) - 1, max(0, round(q / 100 * (len(ordered) - 1))))
+    return ordered[idx]
+
+
+class Recorder:
+    def __init__(self):
+        self.latencies: Dict[str, List[float]] = defaultdict(list)
+        self.errors: Dict[str, int] = defaultdict(int)
+        self.statuses: Dict[str, int] = defaultdict(int)
+        self.time_to_video: List[float] = []
+        self.jobs = 0
+
+    async def call(self, route: str, coro) -> Optional[httpx.Response]:
+        t0 = time.perf_counter()
+        try:
+            r = await coro
+        except httpx.HTTPError:
+            self.errors[route] += 1
+            self.latencies[route].append(time.perf_counter() - t0)
+            return None
+        self.latencies[route].append(time.perf_counter() - t0)
+        if r.status_code >= 400:
+            self.errors[route] += 1
+            return None
+        return r
+
+
+async def client_flow(c: httpx.AsyncClient, rec: Recorder, args) -> None:
+    started = time.perf_counter()
+    prompt = f"bench {random.randrange(args.distinct_prompts)}: a red fox runs through snow"
+    r = await rec.call("generate", c.post("/generate", json={"user_prompt": prompt, "dedupe": args.dedupe}))
+    if r is None:
+        return
+    rec.jobs += 1
+    data = r.json()
+    job_id, status = data["job_id"], data["status"]
+    deadline = started + args.job_timeout
+    while status not in ("succeeded", "failed") and time.perf_counter() < deadline:
+        await asyncio.sleep(args.poll_interval)
+        r = await rec.call("status", c.get(f"/status/{job_id}"))
+        if r is not None:
+            status = r.json()["status"]
+    rec.statuses[status] += 1
+    if status == "succeeded":
+        rec.time_to_video.append(time.perf_counter() - started)
+
+
+async def provider_calls(c: httpx.AsyncClient) -> Dict[str, int]:
+    try:
+        r = await c.get("/stats")
+        return dict(r.json().get("provider", {}).get("calls", {}))
+    except (httpx.HTTPError, ValueError):
+        return {}
+
+
+def _fmt(v: Optional[float]) -> str:
+    return "-" if v is None else f"{v * 1000:8.1f}ms"
+
+
+async def run(args) -> Dict:
+    rec = Recorder()
+    limits = httpx.Limits(max_connections=args.max_connections, max_keepalive_connections=args.max_connections)
+    async with httpx.AsyncClient(base_url=args.base_url, timeout=args.timeout, limits=limits) as c:
+        before = await provider_calls(c)
+        tasks = []
+        t0 = time.perf_counter()
+        n = 0
+        while time.perf_counter() - t0 < args.duration:
+            tasks.append(asyncio.create_task(client_flow(c, rec, args)))
+            n += 1
+            # открытая модель нагрузки: запуски идут по расписанию, не дожидаясь ответов
+            await asyncio.sleep(max(0.0, t0 + n / args.rps - time.perf_counter()))
+        await asyncio.gather(*tasks)
+        elapsed = time.perf_counter() - t0
+        after = await provider_calls(c)
+
+    upstream = {k: after.get(k, 0) - before.get(k, 0) for k in after}
+    report = {
+        "elapsed_sec": round(elapsed, 1),
+        "clients": n,
+        "jobs": rec.jobs,
+        "final_statuses": dict(rec.statuses),
+        "routes": {
+            route: {
+                "requests": len(lat),
+                "errors": rec.errors[route],
+                "error_rate": round(rec.errors[route] / len(lat), 4) if lat else None,
+                "p50": percentile(lat, 50),
+                "p95": percentile(lat, 95),
+                "p99": percentile(lat, 99),
+            }
+            for route, lat in rec.latencies.items()
+        },
+        "time_to_video": {q: percentile(rec.time_to_video, q) for q in (50, 95, 99)},
+        "upstream_calls": upstream,
+        "upstream_calls_per_job": {k: round(v / rec.jobs, 2) for k, v in upstream.items()} if rec.jobs else {},
+    }
+    return report
+
+
+def print_report(report: Dict) -> None:
+    print(f"clients={report['clients']} jobs={report['jobs']} elapsed={report['elapsed_sec']}s "
+          f"final={report['final_statuses']}")
+    print(f"{'route':<10}{'reqs':>8}{'err%':>8}{'p50':>12}{'p95':>12}{'p99':>12}")
+    for route, r in report["routes"].items():
+        err = "-" if r["error_rate"] is None else f"{r['error_rate'] * 100:.2f}"
+        print(f"{route:<10}{r['requests']:>8}{err:>8}{_fmt(r['p50']):>12}{_fmt(r['p95']):>12}{_fmt(r['p99']):>12}")
+    ttv = report["time_to_video"]
+    print("time to video: " + "  ".join(f"p{q}={'-' if v is None else f'{v:.1f}s'}" for q, v in ttv.items()))
+    print(f"upstream calls: {report['upstream_calls']}  per job: {report['upstream_calls_per_job']}")
+
+
+def main() -> None:
+    p = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    p.add_argument("--base-url", default="http://localhost:8000")
+    p.add_argument("--rps", type=float, default=5.0, help="новых клиентов (генераций) в секунду")
+    p.add_argument("--duration", type=float, default=30.0, help="сколько секунд запускать клиентов")
+    p.add_argument("--poll-interval", type=float, default=3.0)
+    p.add_argument("--job-timeout", type=float, default=300.0)
+    p.add_argument("--timeout", type=float, default=30.0, help="таймаут одного HTTP-запроса")
+    p.add_argument("--max-connections", type=int, default=500)
+    p.add_argument("--distinct-prompts", type=int, default=1_000_000,
+                   help="сколько разных промптов (меньше — больше совпадений для dedupe)")
+    p.add_argument("--no-dedupe", dest="dedupe", action="store_false")
+    p.add_argument("--json", action="store_true", help="вывести отчёт в JSON")
+    args = p.parse_args()
+
+    report = asyncio.run(run(args))
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        print_report(report)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,124 @@
+"""Фейковый HTTP-сервер Higgsfield для нагрузочных тестов без трат кредитов.
+
+Повторяет маршруты, которыми пользуется HiggsfieldProvider, поверх FakeProvider:
+
+    cd hf_initial_server
+    PROVIDER=fake FAKE_COMPLETION_TIME_SEC=15 uvicorn tools.fake_higgsfield:app --port 9000
+    HIGGSFIELD_BASE_URL=http://localhost:9000 HIGGSFIELD_API_KEY=fake HIGGSFIELD_API_SECRET=fake \
+        RESULT_ALLOWED_HOSTS=localhost RESULT_ALLOW_HTTP=1 \
+        uvicorn main:app --port 8000
+
+Параметры задержек и ошибок — те же FAKE_* из config.Settings. Видео отдаются
+с /_videos/{job_id}.mp4 (FAKE_VIDEO_BYTES случайных байт) по http, поэтому /result
+основного сервера работает только с RESULT_ALLOWED_HOSTS=localhost (хост из
+FAKE_PUBLIC_URL) и RESULT_ALLOW_HTTP=1 — в проде так не запускать. Счётчики
+запросов — на /_stats. Если в submit передан webhook, по завершении job'а на него
+придёт POST.
+"""
+import asyncio
+import os
+import time
+from collections import Counter
+from typing import Any, Dict
+
+import httpx
+from fastapi import Body, FastAPI, HTTPException, Request
+from fastapi.responses import Response
+
+from config import settings
+from providers.fake import FakeProvider
+
+VIDEO_BYTES = int(os.getenv("FAKE_VIDEO_BYTES", str(2 * 1024 * 1024)))
+PUBLIC_URL = os.getenv("FAKE_PUBLIC_URL", "http://localhost:9000").rstrip("/")
+
+fake = FakeProvider(
+    submit_latency_sec=settings.FAKE_SUBMIT_LATENCY_SEC,
+    status_latency_sec=settings.FAKE_STATUS_LATENCY_SEC,
+    queue_time_sec=settings.FAKE_QUEUE_TIME_SEC,
+    completion_time_sec=settings.FAKE_COMPLETION_TIME_SEC,
+    latency_sigma=settings.FAKE_LATENCY_SIGMA,
+    submit_failure_rate=settings.FAKE_SUBMIT_FAILURE_RATE,
+    job_failure_rate=settings.FAKE_JOB_FAILURE_RATE,
+    video_base_url=f"{PUBLIC_URL}/_videos",
+)
+requests_by_route: Counter = Counter()
+started_at = time.time()
+webhooks_sent = 0
+_video = os.urandom(VIDEO_BYTES)
+
+app = FastAPI(title="Fake Higgsfield", version="1.0.0")
+
+
+@app.middleware("http")
+async def count_requests(request: Request, call_next):
+    route = request.url.path.split("/")[1] or "/"
+    requests_by_route[route] += 1
+    return await call_next(request)
+
+
+async def _notify_when_done(job_id: str, webhook: Dict[str, Any]) -> None:
+    global webhooks_sent
+    job = fake.jobs.get(job_id)
+    if job is None:
+        return
+    await asyncio.sleep(max(0.0, job.finished_at - time.time()))
+    doc = fake.job_set_doc(job_id)
+    if doc is None:
+        return  # job вытеснен по max_jobs, пока ждали
+    async with httpx.AsyncClient(timeout=10) as client:
+        try:
+            secret = webhook.get("secret")
+            r = await client.post(
+                webhook["url"],
+                json=doc,
+                headers={"X-Webhook-Secret": secret} if secret else None,
+            )
+            r.raise_for_status()
+            webhooks_sent += 1
+        except httpx.HTTPError as e:
+            print(f"[fake] webhook for {job_id} failed: {e}")
+
+
+@app.post("/generate/{model}")
+async def generate(model: str, payload: Dict[str, Any] = Body(...)):
+    params = payload.get("params") or {}
+    try:
+        job_id = await fake.submit(
+            prompt=params.get("prompt", ""),
+            duration_s=params.get("duration", 10),
+            aspect_ratio=params.get("aspect_ratio", ""),
+            seed=params.get("seed"),
+            model=model,
+            webhook=payload.get("webhook"),
+        )
+    except httpx.HTTPStatusError as e:
+        raise HTTPException(e.response.status_code, str(e), headers=dict(e.response.headers))
+    if payload.get("webhook"):
+        asyncio.create_task(_notify_when_done(job_id, payload["webhook"]))
+    return {"id": job_id}
+
+
+@app.get("/v1/job-sets/{job_id}")
+async def job_set(job_id: str):
+    await asyncio.sleep(fake.status_latency_sec)
+    doc = fake.job_set_doc(job_id)
+    if doc is None:
+        raise HTTPException(404, "job set not found")
+    return doc
+
+
+@app.get("/_videos/{job_id}.mp4")
+async def video(job_id: str):
+    if job_id not in fake.jobs:
+        raise HTTPException(404, "no such video")
+    return Response(_video, media_type="video/mp4")
+
+
+@app.get("/_stats")
+async def stats():
+    return {
+        "uptime_sec": round(time.time() - started_at, 1),
+        "requests": dict(requests_by_route),
+        "jobs": len(fake.jobs),
+        "webhooks_sent": webhooks_sent,
+    }
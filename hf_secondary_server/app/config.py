@@ -21,5 +21,41 @@ SPACES_REGION     = os.getenv("SPACES_REGION", "fra1")
 SPACES_BUCKET     = os.getenv("SPACES_BUCKET", "hacknu")
 SPACES_ACCESS_KEY = os.getenv("SPACES_ACCESS_KEY", "")
 SPACES_SECRET_KEY = os.getenv("SPACES_SECRET_KEY", "")
+# ключи объектов: hash (sha256 содержимого, одинаковые файлы не заливаются повторно) | timestamp
+SPACES_KEY_MODE   = os.getenv("SPACES_KEY_MODE", "hash")
+
+# последний кадр: читать хвост видео по URL через Range вместо полного скачивания
+FRAME_REMOTE_SEEK = os.getenv("FRAME_REMOTE_SEEK", "1").lower() in ("1", "true", "yes")
+# чем доставать кадр: subprocess (ffmpeg) | pyav (libav в процессе, нужны av и Pillow)
+FRAME_BACKEND     = os.getenv("FRAME_BACKEND", "subprocess")
+
+# кэш готовых последних кадров: (URL + ETag/размер) → image_url в Spaces
+FRAME_CACHE_PATH        = os.path.abspath(os.getenv("FRAME_CACHE_PATH", "./data/frame_cache.sqlite3"))
+FRAME_CACHE_TTL_SEC     = float(os.getenv("FRAME_CACHE_TTL_SEC", str(7 * 24 * 3600)))
+FRAME_CACHE_MAX_ENTRIES = int(os.getenv("FRAME_CACHE_MAX_ENTRIES", "10000"))
+
+# кэш метаданных видео (URL + ETag/размер); PROBE_CACHE_PATH пустой — только в памяти
+PROBE_CACHE_MAX_ENTRIES = int(os.getenv("PROBE_CACHE_MAX_ENTRIES", "1024"))
+PROBE_CACHE_PATH        = os.getenv("PROBE_CACHE_PATH", "")
+
+# опрос job-set'ов: первая проверка сразу, дальше экспоненциальный рост паузы с jitter
+POLL_MIN_INTERVAL_SEC = float(os.getenv("POLL_MIN_INTERVAL_SEC", "2"))
+POLL_MAX_INTERVAL_SEC = float(os.getenv("POLL_MAX_INTERVAL_SEC", "20"))
+POLL_BACKOFF_FACTOR   = float(os.getenv("POLL_BACKOFF_FACTOR", "1.5"))
+POLL_JITTER           = float(os.getenv("POLL_JITTER", "0.2"))
+POLL_DEADLINE_SEC     = float(os.getenv("POLL_DEADLINE_SEC", "1800"))
+POLL_CONCURRENCY      = int(os.getenv("POLL_CONCURRENCY", "16"))
+
+PIPELINE_DB_PATH   = os.path.abspath(os.getenv("PIPELINE_DB_PATH", "./data/pipeline.sqlite3"))
+PIPELINE_WORKERS   = int(os.getenv("PIPELINE_WORKERS", "32"))
+PIPELINE_MAX_ATTEMPTS = int(os.getenv("PIPELINE_MAX_ATTEMPTS", "3"))
+# аренда running-задачи: владелец продлевает её heartbeat'ом; просроченную забирает любой процесс
+PIPELINE_LEASE_SEC = float(os.getenv("PIPELINE_LEASE_SEC", "60"))
+
+GZIP_MIN_SIZE = int(os.getenv("GZIP_MIN_SIZE", "1024"))
+
+# debug_*.json с запросами/ответами Higgsfield (WORKDIR/debug), хранятся последние DEBUG_DUMPS_MAX
+DEBUG_DUMPS     = os.getenv("DEBUG_DUMPS", "0").lower() in ("1", "true", "yes")
+DEBUG_DUMPS_MAX = int(os.getenv("DEBUG_DUMPS_MAX", "200"))
 
 os.makedirs(WORKDIR, exist_ok=True)
@@ -1,20 +1,62 @@
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
+from fastapi.middleware.gzip import GZipMiddleware
+from fastapi.responses import ORJSONResponse
 from app.routers.frames import router as frames_router
 from app.routers.generate import router as generate_router
 from app.routers.status import router as status_router
 from app.routers.pipeline import router as pipeline_router  # <— вот это
+from app.config import GZIP_MIN_SIZE
+from app.services import higgsfield, video
+from app.services.job_queue import job_queue
+from app.services.media_probe import probe_cache
+from app.services.frame_backends import frame_backend
+from app.services.frame_cache import frame_cache
+from app.services.s3_uploader import uploader
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # хвосты прошлых запусков (недокачанные видео, кадры); восстановленные задачи их не используют
+    video.cleanup_workdir()
+    try:
+        await uploader.bootstrap()
+    except Exception as e:
+        # Spaces недоступен при старте — повторим при первой заливке
+        print(f"[spaces] bootstrap at startup failed: {e}")
+    job_queue.start()
+    yield
+    await job_queue.stop()
+    await uploader.aclose()
+    await higgsfield.aclose()
+    await video.aclose()
 
 app = FastAPI(
     title="Higgsfield Multimodal Orchestrator",
     version="0.2.0",
     description="Единый пайплайн + низкоуровневые ручки (frames/generate/status).",
+    default_response_class=ORJSONResponse,
+    lifespan=lifespan,
 )
 
+app.add_middleware(GZipMiddleware, minimum_size=GZIP_MIN_SIZE)
+
 app.include_router(frames_router)
 app.include_router(generate_router)
 app.include_router(status_router)
 app.include_router(pipeline_router)  # <— и это
 
 @app.get("/health", tags=["meta"])
-def health():
+async def health():
     return {"ok": True}
+
+@app.get("/stats", tags=["meta"])
+async def stats():
+    return {
+        "poller": higgsfield.poller.stats(),
+        "pipeline_jobs": job_queue.stats(),
+        "media_probe": probe_cache.stats(),
+        "frame_backend": frame_backend.name,
+        "frame_cache": frame_cache.stats(),
+        "uploader": uploader.stats(),
+    }
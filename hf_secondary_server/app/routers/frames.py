@@ -1,11 +1,13 @@
 from fastapi import APIRouter, HTTPException
 import os
 import uuid
+import httpx
 
 from app.schemas import FromVideoReq, FromVideoResp
-from app.config import WORKDIR
-from app.services.video import ensure_workdir, curl_download, get_meta, extract_last_frame
+from app.config import WORKDIR, FRAME_REMOTE_SEEK
+from app.services.video import ensure_workdir, grab_last_frame, head_key, normalize_video_url, range_probe, remove_files
 from app.services.s3_uploader import upload_file
+from app.services.frame_cache import FrameEntry, frame_cache
 
 router = APIRouter(prefix="/frames", tags=["frames"])
 
@@ -13,41 +15,51 @@ router = APIRouter(prefix="/frames", tags=["frames"])
     "/from-video",
     response_model=FromVideoResp,
     summary="Сделать image_url из последнего кадра видео",
-    description="Скачивает видео по URL, берёт последний кадр, грузит его в S3 (Spaces), возвращает публичный image_url."
+    description="Берёт последний кадр видео по URL (хвост по Range или полное скачивание), грузит его в S3 (Spaces), возвращает публичный image_url."
 )
-def frame_from_video(req: FromVideoReq):
+async def frame_from_video(req: FromVideoReq):
     ensure_workdir()
     vid_id = str(uuid.uuid4())
-    local_video = os.path.join(WORKDIR, f"{vid_id}.mp4")
     frame_path = os.path.join(WORKDIR, f"{vid_id}_last.jpg")
-    t = None
+    url = normalize_video_url(str(req.video_url))
 
+    # ключ кэша (ETag) нужен всегда, range-проба — только для извлечения кадра с хвоста
     try:
-        curl_download(req.video_url, local_video)
+        if FRAME_REMOTE_SEEK:
+            ranges, key = await range_probe(url)
+        else:
+            ranges, key = False, await head_key(url)
+    except httpx.HTTPError as e:
+        print(f"[frame] source probe failed: {e}")
+        ranges, key = False, None
 
-        w, h, dur, fps = get_meta(local_video)
-        t = extract_last_frame(local_video, frame_path)
+    cached = frame_cache.get(key)
+    if cached is not None:
+        return FromVideoResp(
+            video_url=req.video_url,
+            width=cached.meta.width, height=cached.meta.height,
+            duration=cached.meta.duration, fps=cached.meta.fps,
+            frame_time_sec=round(cached.frame_time, 3),
+            local_frame_path=None,
+            image_url=cached.image_url,
+            frame_source="cache",
+        )
+
+    try:
+        media, t, source = await grab_last_frame(url, frame_path, vid_id, ranges=ranges, meta_key=key)
 
-        image_url = upload_file(frame_path, prefix="frames")
+        image_url = await upload_file(frame_path, prefix="frames")
+        frame_cache.put(key, FrameEntry(image_url, media, t, source))
 
         return FromVideoResp(
             video_url=req.video_url,
-            local_video_path=local_video,
-            width=w, height=h, duration=dur, fps=fps,
+            local_video_path=None,  # скачанное видео удалено в grab_last_frame
+            width=media.width, height=media.height, duration=media.duration, fps=media.fps,
             frame_time_sec=round(t or 0, 3),
             local_frame_path=frame_path,
-            image_url=image_url
+            image_url=image_url,
+            frame_source=source,
         )
 
     finally:
-        try:
-            if os.path.exists(local_video):
-                os.remove(local_video)
-        except Exception as e:
-            print(f"[cleanup] video remove warn: {e}")
-
-        try:
-            if os.path.exists(frame_path):
-                os.remove(frame_path)
-        except Exception as e:
-            print(f"[cleanup] frame remove warn: {e}")
+        remove_files(frame_path)
@@ -10,7 +10,7 @@ router = APIRouter(prefix="/generate", tags=["generate"])
     summary="Запустить Higgsfield image2video/minimax",
     description="Принимает image_url и prompt, отправляет POST на Higgsfield, возвращает job_set_id. Логи и debug-дампы включены."
 )
-def generate_minimax_i2v(req: GenerateReq):
+async def generate_minimax_i2v(req: GenerateReq):
     params = {
         "duration": req.duration,
         "resolution": req.resolution,
@@ -19,7 +19,7 @@ def generate_minimax_i2v(req: GenerateReq):
         "prompt": req.prompt,
     }
     try:
-        submit = submit_minimax_i2v(params)
+        submit = await submit_minimax_i2v(params)
     except Exception as e:
         raise HTTPException(502, detail=f"submit failed: {e}")
 
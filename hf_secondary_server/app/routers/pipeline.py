@@ -1,16 +1,10 @@
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Path
 from pydantic import BaseModel, Field, HttpUrl
-import os
-import uuid
-
-from app.config import WORKDIR
-from app.services.video import (
-    ensure_workdir, get_meta, extract_last_frame,
-    normalize_video_url, preflight_video_url, download_video,
-    cleanup_workdir,
-)
-from app.services.s3_uploader import upload_file
-from app.services.higgsfield import submit_minimax_i2v, poll_job_set
+from typing import Any, Optional
+
+from app.services.job_queue import JobQueue, job_queue
+from app.services.pipeline import PipelineFailed, check_video_url, run_continue
+from app.services.video import normalize_video_url
 
 router = APIRouter(prefix="/pipeline", tags=["pipeline"])
 
@@ -29,101 +23,101 @@ class ContinueResp(BaseModel):
     meta: dict
 
 
+class PipelineJobResp(BaseModel):
+    job_id: str
+    status: str = Field(..., description="queued | running | succeeded | failed | cancelled")
+    stage: str = Field(..., description="queued | preflight | extract_frame | upload_frame | submit | generate | done | failed | cancelled")
+    attempts: int = 0
+    result: Optional[ContinueResp] = None
+    error: Optional[Any] = None
+    error_code: Optional[int] = Field(None, description="HTTP-код ошибки шага (400 — плохой previous_video_url, 502 — сбой upstream)")
+    created_at: float
+    updated_at: float
+
+
+@job_queue.handler("continue")
+async def _continue_job(queue: JobQueue, job: dict) -> dict:
+    req = job["request"]
+
+    async def on_stage(stage: str, checkpoint: Optional[dict]):
+        # отмена между шагами: в том числе до отправки в Higgsfield, пока кредиты не потрачены
+        if job["cancel"].is_set():
+            raise PipelineFailed("cancelled", code=409)
+        queue.set_stage(job["id"], stage, checkpoint)
+
+    return await run_continue(
+        job["id"],
+        req["previous_video_url"],
+        req["previous_prompt"],
+        req["next_prompt"],
+        checkpoint=job["checkpoint"],
+        on_stage=on_stage,
+        cancel=job["cancel"],
+    )
+
+
+def _job_resp(job: dict) -> PipelineJobResp:
+    return PipelineJobResp(
+        job_id=job["id"],
+        status=job["status"],
+        stage=job["stage"],
+        attempts=job["attempts"],
+        result=job["result"],
+        error=job["error"],
+        error_code=job["error_code"],
+        created_at=job["created_at"],
+        updated_at=job["updated_at"],
+    )
+
+
 @router.post(
     "/continue",
-    response_model=ContinueResp,
-    summary="Продолжить видео одним вызовом",
+    response_model=PipelineJobResp,
+    status_code=202,
+    summary="Поставить продолжение видео в очередь",
     description=(
-        "1) Скачивает предыдущее видео\n"
-        "2) Берёт последний кадр и заливает его в Spaces (CDN)\n"
+        "Проверяет previous_video_url (400, если это не доступное видео) и сразу возвращает "
+        "job_id; фоновый воркер выполняет:\n"
+        "1) Берёт последний кадр предыдущего видео (хвост по Range или полное скачивание)\n"
+        "2) Заливает кадр в Spaces (CDN)\n"
         "3) Отправляет image2video/minimax с составным промптом "
         "(previous→next)\n"
-        "4) Ждёт завершения и возвращает URL нового видео + только next_prompt"
+        "4) Ждёт завершения; URL нового видео — в result у GET /pipeline/jobs/{job_id}"
     ),
 )
-def continue_video(req: ContinueReq):
-    ensure_workdir()
-
-    raw_url = str(req.previous_video_url)
-    safe_url = normalize_video_url(raw_url)
-    pf = preflight_video_url(safe_url)
-    print("preflight previous_video_url →", pf)
-    if not pf.get("ok"):
-        raise HTTPException(400, detail={
-            "msg": "previous_video_url не выглядит как доступное видео",
-            "checked_url": safe_url,
-            "check": pf
-        })
-
-    vid_id = str(uuid.uuid4())
-    local_video = os.path.join(WORKDIR, f"{vid_id}.mp4")
-    download_video(safe_url, local_video)
-
-    w, h, dur, fps = get_meta(local_video)
-    frame_path = os.path.join(WORKDIR, f"{vid_id}_last.jpg")
-    t = extract_last_frame(local_video, frame_path)
-
-    try:
-        frame_image_url = upload_file(frame_path, prefix="frames")
-    except Exception as e:
-        raise HTTPException(502, detail=f"upload to Spaces failed: {e}")
-
-
-    prompt_text = (
-        f"In first part of video was {req.previous_prompt}, "
-        f"generate new part with {req.next_prompt}"
-    )
-
-    params = {
-        "duration": 10,
-        "resolution": "768",
-        "enhance_prompt": True,
-        "input_image": {"type": "image_url", "image_url": frame_image_url},
-        "prompt": prompt_text,
-    }
-
+async def continue_video(req: ContinueReq):
+    # плохой URL — синхронный 400, как раньше, а не failed-задача
     try:
-        submit = submit_minimax_i2v(params)
-    except Exception as e:
-        raise HTTPException(502, detail=f"submit to Higgsfield failed: {e}")
-
-    job_set_id = submit.get("id")
-    if not job_set_id:
-        raise HTTPException(500, detail="No job_set_id in submit response")
-
-    try:
-        js = poll_job_set(job_set_id)
-    except Exception as e:
-        raise HTTPException(502, detail=f"poll job failed: {e}")
-
-    jobs = js.get("jobs") or []
-    status = jobs[0].get("status") if jobs else "unknown"
-    if status != "completed":
-        raise HTTPException(500, detail=f"Job did not complete (status={status})")
-
-    try:
-        new_video_url = jobs[0]["results"]["raw"]["url"]
-    except Exception as e:
-        raise HTTPException(500, detail=f"parse results failed: {e}")
-        
-
-    resp = ContinueResp(
-        new_video_url=new_video_url,
-        used_prompt=req.next_prompt, 
-        job_set_id=job_set_id,
-        frame_image_url=frame_image_url,
-        meta={
-            "previous_video_url": safe_url,
-            "previous_prompt": req.previous_prompt,
-            "video_meta": {"width": w, "height": h, "duration": dur, "fps": fps},
-            "last_frame_time": round(t, 3),
-            "higgsfield_params": params,
-        },
-    )
+        pf = await check_video_url(normalize_video_url(str(req.previous_video_url)))
+    except PipelineFailed as e:
+        raise HTTPException(e.code, detail=e.detail)
+    job_id = job_queue.enqueue("continue", req.model_dump(mode="json"), checkpoint={"preflight": pf})
+    return _job_resp(job_queue.get(job_id))
+
+
+@router.get(
+    "/jobs/{job_id}",
+    response_model=PipelineJobResp,
+    summary="Статус задачи пайплайна",
+    description="Статус и текущий шаг задачи; при succeeded в result — ответ продолжения (new_video_url и т.д.).",
+)
+async def pipeline_job(job_id: str = Path(..., description="ID из ответа POST /pipeline/continue")):
+    job = job_queue.get(job_id)
+    if job is None:
+        raise HTTPException(404, detail="job not found")
+    return _job_resp(job)
 
-    try:
-        cleanup_workdir()
-    except Exception as e:
-        print(f"[workdir] cleanup after /pipeline/continue warn: {e}")
 
-    return resp
+@router.post(
+    "/jobs/{job_id}/cancel",
+    response_model=PipelineJobResp,
+    summary="Отменить задачу пайплайна",
+    description="queued — отменяется сразу; running — прерывается на ближайшем шаге или паузе опроса.",
+)
+async def cancel_pipeline_job(job_id: str = Path(..., description="ID из ответа POST /pipeline/continue")):
+    job = job_queue.get(job_id)
+    if job is None:
+        raise HTTPException(404, detail="job not found")
+    if not job_queue.cancel(job_id):
+        raise HTTPException(409, detail=f"job is already {job['status']}")
+    return _job_resp(job_queue.get(job_id))
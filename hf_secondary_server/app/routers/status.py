@@ -1,15 +1,19 @@
-from fastapi import APIRouter, HTTPException, Path
+from fastapi import APIRouter, HTTPException, Path, Query
 from app.schemas import StatusResp
-from app.services.higgsfield import poll_job_set
+from app.services.higgsfield import fetch_job_set, poll_job_set, compact_job_set
 
 router = APIRouter(prefix="/status", tags=["status"])
 
 @router.get("/{job_set_id}", response_model=StatusResp,
             summary="Проверить статус job-set",
-            description="Опрашивает Higgsfield до завершения, при completed возвращает ссылку на видео.")
-def check_status(job_set_id: str = Path(..., description="ID из submit-ответа"), wait: bool = True):
+            description="Опрашивает Higgsfield до завершения (wait=false — одна проверка), при completed возвращает ссылку на видео.")
+async def check_status(
+    job_set_id: str = Path(..., description="ID из submit-ответа"),
+    wait: bool = True,
+    verbose: bool = Query(False, description="Вернуть полный job-set в raw"),
+):
     try:
-        js = poll_job_set(job_set_id) if wait else {"jobs": [{"status": "unknown"}]}
+        js = await poll_job_set(job_set_id) if wait else await fetch_job_set(job_set_id)
     except Exception as e:
         raise HTTPException(502, detail=f"poll failed: {e}")
 
@@ -21,4 +25,10 @@ def check_status(job_set_id: str = Path(..., description="ID из submit-отв
             video_url = jobs[0]["results"]["raw"]["url"]
         except Exception:
             pass
-    return StatusResp(job_set_id=job_set_id, status=status, video_url=video_url, raw=js)
+    return StatusResp(
+        job_set_id=job_set_id,
+        status=status,
+        video_url=video_url,
+        raw=js if verbose else None,
+        **compact_job_set(js),
+    )
@@ -6,14 +6,15 @@ class FromVideoReq(BaseModel):
 
 class FromVideoResp(BaseModel):
     video_url: HttpUrl
-    local_video_path: str
+    local_video_path: Optional[str] = Field(default=None, description="Не заполняется: скачанное видео удаляется сразу после извлечения кадра")
     width: int
     height: int
     duration: float
     fps: int
     frame_time_sec: float
-    local_frame_path: str
+    local_frame_path: Optional[str] = Field(default=None, description="Нет, если кадр взят из кэша")
     image_url: HttpUrl
+    frame_source: str = Field(default="download", description="range | download | cache")
 
 class GenerateReq(BaseModel):
     image_url: HttpUrl
@@ -30,4 +31,6 @@ class StatusResp(BaseModel):
     job_set_id: str
     status: str
     video_url: Optional[str] = None
-    raw: Dict[str, Any]
+    progress: Optional[Dict[str, Any]] = None
+    timings: Optional[Dict[str, Any]] = None
+    raw: Optional[Dict[str, Any]] = Field(default=None, description="Полный job-set, только при verbose=1")
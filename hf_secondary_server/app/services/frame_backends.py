@@ -0,0 +1,145 @@
+# app/services/frame_backends.py
+import asyncio
+import json
+import subprocess
+
+from app.config import FRAME_BACKEND
+
+
+class FrameExtractionError(RuntimeError):
+    """Бэкенд не смог достать кадр (общая ошибка для ffmpeg-процесса и libav)."""
+
+
+def _tail_offset(duration: float) -> float:
+    return 0.1 if duration > 0.1 else 0.05
+
+
+class SubprocessBackend:
+    """Последний кадр через процесс ffmpeg (-sseof): работает и с файлом, и с URL (Range).
+    Метаданные — через процесс ffprobe."""
+
+    name = "subprocess"
+
+    async def probe(self, src: str) -> dict:
+        """ffprobe -print_format json -show_format -show_streams."""
+        proc = await asyncio.create_subprocess_exec(
+            "ffprobe", "-v", "error", "-print_format", "json", "-show_format", "-show_streams", src,
+            stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+        )
+        out, err = await proc.communicate()
+        if proc.returncode != 0:
+            raise subprocess.CalledProcessError(proc.returncode, ["ffprobe", src], output=out, stderr=err)
+        return json.loads(out or b"{}")
+
+    async def extract_last(self, src: str, out_path: str, duration: float) -> float:
+        offset = _tail_offset(duration)
+        proc = await asyncio.create_subprocess_exec(
+            "ffmpeg", "-v", "error", "-sseof", f"-{offset:.3f}", "-i", src,
+            "-frames:v", "1", "-update", "1", "-y", out_path,
+            stdout=subprocess.DEVNULL, stderr=subprocess.PIPE,
+        )
+        _, err = await proc.communicate()
+        if proc.returncode != 0:
+            raise FrameExtractionError(
+                f"ffmpeg exited with {proc.returncode}: {err.decode(errors='replace').strip()[-500:]}"
+            )
+        return max(0.0, duration - offset)
+
+
+class PyAVBackend:
+    """Последний кадр в процессе через libav (PyAV): seek к ключевому кадру перед хвостом и
+    декодирование вперёд до конца. Метаданные — из того же av.open, без ffprobe.
+    Без fork/exec; работа с libav идёт в отдельном потоке."""
+
+    name = "pyav"
+
+    def __init__(self):
+        import av  # noqa: F401 — проверяем наличие зависимости при выборе бэкенда
+        from PIL import Image  # noqa: F401 — frame.to_image() требует Pillow
+
+    @staticmethod
+    def _extract_sync(src: str, out_path: str, duration: float) -> float:
+        import av
+
+        with av.open(src) as container:
+            stream = container.streams.video[0]
+            stream.thread_type = "AUTO"
+            target = duration - _tail_offset(duration)
+            if target > 0:
+                # без stream= позиция в av.time_base; backward — ближайший ключевой кадр до target
+                container.seek(int(target * av.time_base), backward=True, any_frame=False)
+            last = None
+            for frame in container.decode(stream):
+                last = frame
+            if last is None:
+                raise ValueError(f"no video frames decoded from {src}")
+            last.to_image().save(out_path, quality=95)
+            return float(last.time) if last.time is not None else max(0.0, target)
+
+    @staticmethod
+    def _probe_sync(src: str) -> dict:
+        import av
+
+        with av.open(src) as container:
+            streams = []
+            for stream in container.streams.video[:1]:
+                ctx = stream.codec_context
+                rate = stream.base_rate or stream.average_rate
+                duration = (
+                    float(stream.duration * stream.time_base)
+                    if stream.duration is not None and stream.time_base is not None
+                    else None
+                )
+                streams.append({
+                    "codec_type": "video",
+                    "codec_name": ctx.name,
+                    "width": ctx.width,
+                    "height": ctx.height,
+                    "r_frame_rate": f"{rate.numerator}/{rate.denominator}" if rate else None,
+                    "duration": duration,
+                })
+            size = getattr(container, "size", None)
+            return {
+                "streams": streams,
+                "format": {
+                    "duration": container.duration / av.time_base if container.duration else None,
+                    "size": str(size) if size and size > 0 else None,
+                },
+            }
+
+    async def probe(self, src: str) -> dict:
+        """Метаданные в форме ответа ffprobe (streams/format), чтобы их разбирал parse_ffprobe."""
+        import av
+
+        try:
+            return await asyncio.to_thread(self._probe_sync, src)
+        except (av.error.FFmpegError, OSError) as e:
+            raise FrameExtractionError(f"pyav probe: {e}") from e
+
+    async def extract_last(self, src: str, out_path: str, duration: float) -> float:
+        import av
+
+        try:
+            return await asyncio.to_thread(self._extract_sync, src, out_path, duration)
+        except (av.error.FFmpegError, OSError, ValueError) as e:
+            # av.error.HTTPError, FileNotFoundError, ConnectionRefusedError и т.п. — не ValueError
+            raise FrameExtractionError(f"pyav: {e}") from e
+
+
+BACKENDS = {
+    SubprocessBackend.name: SubprocessBackend,
+    PyAVBackend.name: PyAVBackend,
+}
+
+
+def make_backend(name: str):
+    try:
+        return BACKENDS[name]()
+    except KeyError:
+        raise ValueError(f"unknown FRAME_BACKEND {name!r}, known: {', '.join(BACKENDS)}")
+    except ImportError as e:
+        print(f"[frame] backend {name!r} unavailable ({e}), falling back to subprocess")
+        return SubprocessBackend()
+
+
+frame_backend = make_backend(FRAME_BACKEND)
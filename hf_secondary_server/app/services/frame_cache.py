@@ -0,0 +1,100 @@
+# app/services/frame_cache.py
+import os
+import json
+import time
+import sqlite3
+from dataclasses import dataclass
+
+from app.config import FRAME_CACHE_PATH, FRAME_CACHE_TTL_SEC, FRAME_CACHE_MAX_ENTRIES
+from app.services.media_probe import MediaMeta
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS frame_cache (
+    key          TEXT PRIMARY KEY,
+    image_url    TEXT NOT NULL,
+    meta         TEXT NOT NULL,
+    frame_time   REAL NOT NULL,
+    source       TEXT NOT NULL,
+    created_at   REAL NOT NULL,
+    last_used_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS frame_cache_last_used ON frame_cache(last_used_at);
+"""
+
+
+@dataclass(frozen=True)
+class FrameEntry:
+    image_url: str
+    meta: MediaMeta
+    frame_time: float
+    source: str
+
+
+class FrameCache:
+    """Готовые последние кадры: (URL видео + ETag/размер) → image_url в Spaces + метаданные.
+
+    Повтор /pipeline/continue или /frames/from-video по тому же видео не качает, не режет
+    и не заливает кадр заново. Записи живут ttl_sec, сверх max_entries вытесняются давно не
+    использованные. Кэшируются только ключи с ETag: ключ по размеру (#len=) не отличит
+    перерендеренное видео того же размера по тому же URL и отдал бы старый кадр.
+    """
+
+    def __init__(self, path: str, ttl_sec: float = 7 * 24 * 3600, max_entries: int = 10000):
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._db = sqlite3.connect(path, isolation_level=None, check_same_thread=False)
+        self._db.row_factory = sqlite3.Row
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.executescript(_SCHEMA)
+        self.ttl_sec = ttl_sec
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def cacheable(key: str | None) -> bool:
+        return key is not None and "#etag=" in key
+
+    def get(self, key: str | None) -> FrameEntry | None:
+        if not self.cacheable(key):
+            return None
+        now = time.time()
+        row = self._db.execute(
+            "SELECT * FROM frame_cache WHERE key = ? AND created_at >= ?", (key, now - self.ttl_sec)
+        ).fetchone()
+        if row is None:
+            self.misses += 1
+            return None
+        self._db.execute("UPDATE frame_cache SET last_used_at = ? WHERE key = ?", (now, key))
+        self.hits += 1
+        return FrameEntry(
+            image_url=row["image_url"],
+            meta=MediaMeta(**json.loads(row["meta"])),
+            frame_time=row["frame_time"],
+            source=row["source"],
+        )
+
+    def put(self, key: str | None, entry: FrameEntry):
+        if not self.cacheable(key):
+            return
+        now = time.time()
+        self._db.execute(
+            "INSERT OR REPLACE INTO frame_cache (key, image_url, meta, frame_time, source, created_at, last_used_at)"
+            " VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (key, entry.image_url, json.dumps(entry.meta.as_dict()), entry.frame_time, entry.source, now, now),
+        )
+        self._evict(now)
+
+    def _evict(self, now: float):
+        self._db.execute("DELETE FROM frame_cache WHERE created_at < ?", (now - self.ttl_sec,))
+        self._db.execute(
+            "DELETE FROM frame_cache WHERE key IN ("
+            " SELECT key FROM frame_cache ORDER BY last_used_at DESC LIMIT -1 OFFSET ?)",
+            (self.max_entries,),
+        )
+
+    def stats(self) -> dict:
+        entries = self._db.execute("SELECT COUNT(*) FROM frame_cache").fetchone()[0]
+        return {"entries": entries, "hits": self.hits, "misses": self.misses}
+
+
+frame_cache = FrameCache(FRAME_CACHE_PATH, ttl_sec=FRAME_CACHE_TTL_SEC, max_entries=FRAME_CACHE_MAX_ENTRIES)
@@ -1,24 +1,71 @@
 import os
-import time
 import json
+import time
+import random
+import asyncio
 import httpx
+from collections import deque
+from dataclasses import dataclass, field
 from datetime import datetime
-from app.config import BASE_API, HEADERS_JSON, WORKDIR
+from typing import Dict, Iterator
+from app.config import (
+    BASE_API, HEADERS_JSON, WORKDIR, DEBUG_DUMPS, DEBUG_DUMPS_MAX,
+    POLL_MIN_INTERVAL_SEC, POLL_MAX_INTERVAL_SEC, POLL_BACKOFF_FACTOR,
+    POLL_JITTER, POLL_DEADLINE_SEC, POLL_CONCURRENCY,
+)
+
+_DEBUG_DIR = os.path.join(WORKDIR, "debug")
+
+def _prune_dumps():
+    names = sorted(n for n in os.listdir(_DEBUG_DIR) if n.startswith("debug_"))
+    for name in names[:max(0, len(names) - DEBUG_DUMPS_MAX)]:
+        try:
+            os.remove(os.path.join(_DEBUG_DIR, name))
+        except OSError:
+            pass
 
 def _dump(name: str, data: dict | str):
-    ts = datetime.utcnow().strftime("%Y%m%dT%H%M%SZ")
-    path = os.path.join(WORKDIR, f"debug_{name}_{ts}.json")
+    if not DEBUG_DUMPS:
+        return
+    # микросекунды в имени: сортировка по имени = по времени, файлы одной секунды не затираются
+    ts = datetime.utcnow().strftime("%Y%m%dT%H%M%S%fZ")
+    path = os.path.join(_DEBUG_DIR, f"debug_{ts}_{name}.json")
     try:
+        os.makedirs(_DEBUG_DIR, exist_ok=True)
         with open(path, "w", encoding="utf-8") as f:
             if isinstance(data, str):
                 f.write(data)
             else:
                 json.dump(data, f, ensure_ascii=False, indent=2)
         print(f"[debug] wrote {path}")
+        _prune_dumps()
     except Exception as e:
         print(f"[debug] failed to write {path}: {e}")
 
-def submit_minimax_i2v(params: dict) -> dict:
+_client: httpx.AsyncClient | None = None
+
+def client() -> httpx.AsyncClient:
+    # один пул соединений к Higgsfield на процесс вместо нового Client на каждый вызов
+    global _client
+    if _client is None or _client.is_closed:
+        _client = httpx.AsyncClient(base_url=BASE_API, headers=HEADERS_JSON, timeout=120)
+    return _client
+
+async def aclose():
+    global _client
+    await poller.aclose()
+    if _client is not None and not _client.is_closed:
+        await _client.aclose()
+    _client = None
+
+def compact_job_set(js: dict) -> dict:
+    """Короткая проекция job-set'а: прогресс по job'ам и тайминги без полного документа."""
+    jobs = js.get("jobs") or []
+    done = sum(1 for j in jobs if j.get("status") in ("completed", "failed"))
+    timings = {k: js[k] for k in ("created_at", "started_at", "finished_at", "updated_at") if js.get(k) is not None}
+    return {"progress": {"done": done, "total": len(jobs)}, "timings": timings}
+
+async def submit_minimax_i2v(params: dict) -> dict:
 
     payload = {"params": params}
     _dump("submit_payload", payload)
@@ -26,52 +73,238 @@ def submit_minimax_i2v(params: dict) -> dict:
     print(f"[submit] headers={{'hf-api-key': '***', 'hf-secret': '***', 'Content-Type':'application/json'}}")
     print(f"[submit] params.image_url={params.get('input_image',{}).get('image_url')} duration={params.get('duration')} res={params.get('resolution')} enhance={params.get('enhance_prompt')}")
 
-    with httpx.Client(timeout=120) as c:
-        last = None
-        for attempt in range(3):
+    c = client()
+    last = None
+    for attempt in range(3):
+        try:
+            r = await c.post("/v1/image2video/minimax", content=json.dumps(payload))
+            print(f"[submit] status={r.status_code}")
+            if r.status_code < 400:
+                body = r.json()
+                _dump("submit_ok", body)
+                return body
+            txt = r.text
+            _dump("submit_err", {"status": r.status_code, "text": txt[:2048]})
+            print(f"[submit] error {r.status_code}: {txt[:512]}")
+            last = r
+            if 500 <= r.status_code < 600 and attempt < 2:
+                sleep_s = 3 * (attempt + 1)
+                print(f"[submit] retrying in {sleep_s}s …")
+                await asyncio.sleep(sleep_s)
+                continue
+            break
+        except Exception as e:
+            _dump("submit_exc", {"exc": str(e)})
+            print(f"[submit] exception: {e}")
+            last = e
+            await asyncio.sleep(2)
+    if isinstance(last, httpx.Response):
+        last_body = last.text
+        raise httpx.HTTPStatusError(
+            f"Submit failed {last.status_code}: {last_body[:512]}",
+            request=last.request, response=last
+        )
+    raise RuntimeError(f"Submit failed: {last}")
+
+class PollTimeout(TimeoutError):
+    pass
+
+class PollCancelled(RuntimeError):
+    pass
+
+# сколько секунд от начала опроса до финального статуса занимали недавние job-set'ы
+_completion_times: deque = deque(maxlen=100)
+
+def _observed_quantile(q: float) -> float | None:
+    if len(_completion_times) < 5:
+        return None
+    ordered = sorted(_completion_times)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+def poll_delays(
+    min_interval: float = POLL_MIN_INTERVAL_SEC,
+    max_interval: float = POLL_MAX_INTERVAL_SEC,
+    factor: float = POLL_BACKOFF_FACTOR,
+    jitter: float = POLL_JITTER,
+):
+    """Паузы между проверками: экспоненциальный рост от min_interval до max_interval с ±jitter."""
+    interval = min_interval
+    while True:
+        yield interval * random.uniform(1 - jitter, 1 + jitter)
+        interval = min(max_interval, interval * factor)
+
+async def fetch_job_set(job_set_id: str) -> dict:
+    s = await client().get(f"/v1/job-sets/{job_set_id}")
+    print(f"[poll] {job_set_id} status={s.status_code}")
+    s.raise_for_status()
+    return s.json()
+
+def _job_status(js: dict) -> str | None:
+    jobs = js.get("jobs") or []
+    return jobs[0].get("status") if jobs else None
+
+@dataclass
+class _Watch:
+    future: asyncio.Future
+    started: float
+    due: float
+    delays: Iterator[float] = field(default_factory=poll_delays)
+    waiters: int = 0
+    inflight: bool = False
+    status: str | None = None
+
+class JobSetPoller:
+    """Один фоновый опрос на все ожидаемые job-set'ы.
+
+    Каждый job_set_id опрашивается одним расписанием (сразу, потом poll_delays()) сколько бы
+    запросов его ни ждали; проверки разных job-set'ов идут параллельно, не больше concurrency,
+    через общий client(). Ожидающие получают готовый документ из общего future.
+    Пока не прошло типичное (p10 по недавним job'ам) время генерации, частить бессмысленно —
+    пауза растягивается до него (но не больше POLL_MAX_INTERVAL_SEC).
+    """
+
+    def __init__(self, concurrency: int = POLL_CONCURRENCY):
+        self.concurrency = concurrency
+        self._watches: Dict[str, _Watch] = {}
+        self._sem: asyncio.Semaphore | None = None
+        self._wakeup: asyncio.Event | None = None
+        self._task: asyncio.Task | None = None
+        self.fetches = 0
+        self.waits = 0
+
+    def _ensure_running(self):
+        if self._task is None or self._task.done():
+            self._sem = asyncio.Semaphore(self.concurrency)
+            self._wakeup = asyncio.Event()
+            self._task = asyncio.create_task(self._run())
+
+    async def aclose(self):
+        if self._task is not None:
+            self._task.cancel()
             try:
-                r = c.post(f"{BASE_API}/v1/image2video/minimax",
-                           headers=HEADERS_JSON,
-                           content=json.dumps(payload))
-                print(f"[submit] status={r.status_code}")
-                if r.status_code < 400:
-                    body = r.json()
-                    _dump("submit_ok", body)
-                    return body
-                txt = r.text
-                _dump("submit_err", {"status": r.status_code, "text": txt[:2048]})
-                print(f"[submit] error {r.status_code}: {txt[:512]}")
-                last = r
-                if 500 <= r.status_code < 600 and attempt < 2:
-                    sleep_s = 3 * (attempt + 1)
-                    print(f"[submit] retrying in {sleep_s}s …")
-                    time.sleep(sleep_s)
+                await self._task
+            except asyncio.CancelledError:
+                pass
+        self._task = None
+        for w in self._watches.values():
+            if not w.future.done():
+                w.future.cancel()
+        self._watches.clear()
+
+    async def _run(self):
+        while True:
+            now = time.monotonic()
+            next_due = None
+            for job_set_id, w in list(self._watches.items()):
+                if w.inflight or w.future.done():
                     continue
-                break
-            except Exception as e:
-                _dump("submit_exc", {"exc": str(e)})
-                print(f"[submit] exception: {e}")
-                last = e
-                time.sleep(2)
-        if isinstance(last, httpx.Response):
-            last_body = last.text
-            raise httpx.HTTPStatusError(
-                f"Submit failed {last.status_code}: {last_body[:512]}",
-                request=last.request, response=last
+                if w.due <= now:
+                    w.inflight = True
+                    asyncio.create_task(self._check(job_set_id, w))
+                elif next_due is None or w.due < next_due:
+                    next_due = w.due
+            self._wakeup.clear()
+            try:
+                timeout = None if next_due is None else max(0.0, next_due - now)
+                await asyncio.wait_for(self._wakeup.wait(), timeout=timeout)
+            except asyncio.TimeoutError:
+                pass
+
+    def _forget(self, job_set_id: str, w: _Watch):
+        if self._watches.get(job_set_id) is w:
+            del self._watches[job_set_id]
+
+    async def _check(self, job_set_id: str, w: _Watch):
+        try:
+            async with self._sem:
+                self.fetches += 1
+                js = await fetch_job_set(job_set_id)
+        except httpx.HTTPStatusError as e:
+            if e.response.status_code < 500:
+                # 4xx (нет такого job-set'а, нет доступа) повтором не лечится; исключение
+                # только тем, кто ждёт, иначе «Future exception was never retrieved»
+                if not w.future.done() and w.waiters > 0:
+                    w.future.set_exception(e)
+                self._forget(job_set_id, w)
+                return
+            print(f"[poll] {job_set_id} upstream {e.response.status_code}, retry on schedule")
+        except Exception as e:
+            print(f"[poll] {job_set_id} fetch error, retry on schedule: {e}")
+        else:
+            w.status = _job_status(js)
+            print(f"[poll] status={w.status}")
+            if w.status in ("completed", "failed"):
+                _completion_times.append(time.monotonic() - w.started)
+                if not w.future.done():  # aclose() мог уже отменить future
+                    w.future.set_result(js)
+                self._forget(job_set_id, w)
+                return
+        finally:
+            w.inflight = False
+
+        if w.future.done():
+            return  # watch закрыт, пока шёл запрос
+        now = time.monotonic()
+        delay = next(w.delays)
+        expected = _observed_quantile(0.1)
+        if expected is not None and now - w.started < expected:
+            delay = max(delay, min(expected - (now - w.started), POLL_MAX_INTERVAL_SEC))
+        w.due = now + delay
+        self._wakeup.set()
+
+    async def wait(
+        self,
+        job_set_id: str,
+        deadline_sec: float = POLL_DEADLINE_SEC,
+        cancel: asyncio.Event | None = None,
+    ) -> dict:
+        self._ensure_running()
+        w = self._watches.get(job_set_id)
+        if w is None:
+            now = time.monotonic()
+            w = self._watches[job_set_id] = _Watch(
+                future=asyncio.get_running_loop().create_future(), started=now, due=now
+            )
+            self._wakeup.set()
+        w.waiters += 1
+        self.waits += 1
+        cancelled = asyncio.ensure_future(cancel.wait()) if cancel is not None else None
+        try:
+            done, _ = await asyncio.wait(
+                {w.future} | ({cancelled} if cancelled else set()),
+                timeout=deadline_sec,
+                return_when=asyncio.FIRST_COMPLETED,
             )
-        raise RuntimeError(f"Submit failed: {last}")
+            if w.future in done:
+                return w.future.result()
+            if cancelled is not None and cancelled in done:
+                raise PollCancelled(f"polling of job set {job_set_id} cancelled")
+            raise PollTimeout(f"job set {job_set_id} not finished in {deadline_sec:g}s (status={w.status})")
+        finally:
+            if cancelled is not None:
+                cancelled.cancel()
+            w.waiters -= 1
+            if w.waiters == 0 and not w.future.done():
+                # никто больше не ждёт — перестаём опрашивать
+                self._forget(job_set_id, w)
 
-def poll_job_set(job_set_id: str, interval_sec: int = 30) -> dict:
-    with httpx.Client(timeout=120) as c:
-        while True:
-            time.sleep(interval_sec)
-            s = c.get(f"{BASE_API}/v1/job-sets/{job_set_id}", headers=HEADERS_JSON)
-            print(f"[poll] {job_set_id} status={s.status_code}")
-            s.raise_for_status()
-            js = s.json()
-            _dump("poll_tick", {"job_set_id": job_set_id, "data": js})
-            jobs = js.get("jobs") or []
-            status = jobs[0].get("status") if jobs else None
-            print(f"[poll] status={status}")
-            if status in ("completed", "failed"):
-                return js
+    def stats(self) -> dict:
+        return {
+            "tracked": len(self._watches),
+            "waiters": sum(w.waiters for w in self._watches.values()),
+            "fetches": self.fetches,
+            "waits": self.waits,
+        }
+
+poller = JobSetPoller()
+
+async def poll_job_set(
+    job_set_id: str,
+    deadline_sec: float = POLL_DEADLINE_SEC,
+    cancel: asyncio.Event | None = None,
+) -> dict:
+    """Дождаться completed/failed через общий poller.
+
+    PollTimeout — не успели за deadline_sec; PollCancelled — выставлен cancel.
+    """
+    return await poller.wait(job_set_id, deadline_sec=deadline_sec, cancel=cancel)
@@ -0,0 +1,252 @@
+# app/services/job_queue.py
+import os
+import json
+import time
+import uuid
+import asyncio
+import sqlite3
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from app.config import PIPELINE_DB_PATH, PIPELINE_WORKERS, PIPELINE_MAX_ATTEMPTS, PIPELINE_LEASE_SEC
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS pipeline_jobs (
+    id          TEXT PRIMARY KEY,
+    kind        TEXT NOT NULL,
+    status      TEXT NOT NULL,
+    stage       TEXT NOT NULL,
+    request     TEXT NOT NULL,
+    checkpoint  TEXT,
+    result      TEXT,
+    error       TEXT,
+    error_code  INTEGER,
+    attempts    INTEGER NOT NULL DEFAULT 0,
+    created_at  REAL NOT NULL,
+    updated_at  REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS pipeline_jobs_status ON pipeline_jobs(status, created_at);
+"""
+
+Handler = Callable[["JobQueue", dict], Awaitable[dict]]
+
+
+class JobQueue:
+    """Долговечная очередь фоновых задач в SQLite + пул asyncio-воркеров.
+
+    status: queued → running → succeeded|failed|cancelled; stage — текущий шаг внутри running.
+    Обработчик получает job["cancel"] (asyncio.Event) и должен прерваться, когда он выставлен.
+    running-задача — аренда на lease_sec: процесс-владелец продлевает updated_at heartbeat'ом.
+    Задачи с просроченной арендой (процесс упал или остановлен) возвращаются в queued
+    и продолжаются с сохранённого checkpoint'а; живые задачи соседнего процесса не трогаются.
+    """
+
+    def __init__(self, path: str, workers: int = 4, max_attempts: int = 3, lease_sec: float = 60):
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._db = sqlite3.connect(path, isolation_level=None, check_same_thread=False)
+        self._db.row_factory = sqlite3.Row
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.executescript(_SCHEMA)
+        columns = {r["name"] for r in self._db.execute("PRAGMA table_info(pipeline_jobs)")}
+        if "error_code" not in columns:
+            # база от версии без error_code
+            self._db.execute("ALTER TABLE pipeline_jobs ADD COLUMN error_code INTEGER")
+        self.workers = workers
+        self.max_attempts = max_attempts
+        self.lease_sec = lease_sec
+        self._handlers: Dict[str, Handler] = {}
+        self._tasks: List[asyncio.Task] = []
+        self._wakeup: Optional[asyncio.Event] = None
+        self._cancel_events: Dict[str, asyncio.Event] = {}
+
+    def handler(self, kind: str):
+        def register(fn: Handler) -> Handler:
+            self._handlers[kind] = fn
+            return fn
+        return register
+
+    def enqueue(self, kind: str, request: dict, checkpoint: Optional[dict] = None) -> str:
+        job_id = str(uuid.uuid4())
+        now = time.time()
+        self._db.execute(
+            "INSERT INTO pipeline_jobs (id, kind, status, stage, request, checkpoint, created_at, updated_at)"
+            " VALUES (?, ?, 'queued', 'queued', ?, ?, ?, ?)",
+            (
+                job_id,
+                kind,
+                json.dumps(request, ensure_ascii=False),
+                json.dumps(checkpoint, ensure_ascii=False) if checkpoint is not None else None,
+                now,
+                now,
+            ),
+        )
+        if self._wakeup is not None:
+            self._wakeup.set()
+        return job_id
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        row = self._db.execute("SELECT * FROM pipeline_jobs WHERE id = ?", (job_id,)).fetchone()
+        if row is None:
+            return None
+        job = dict(row)
+        for k in ("request", "checkpoint", "result", "error"):
+            job[k] = json.loads(job[k]) if job[k] else None
+        return job
+
+    def set_stage(self, job_id: str, stage: str, checkpoint: Optional[dict] = None):
+        if checkpoint is None:
+            self._db.execute(
+                "UPDATE pipeline_jobs SET stage = ?, updated_at = ? WHERE id = ?",
+                (stage, time.time(), job_id),
+            )
+        else:
+            self._db.execute(
+                "UPDATE pipeline_jobs SET stage = ?, checkpoint = ?, updated_at = ? WHERE id = ?",
+                (stage, json.dumps(checkpoint, ensure_ascii=False), time.time(), job_id),
+            )
+
+    def _claim(self) -> Optional[Dict[str, Any]]:
+        # BEGIN IMMEDIATE — чтобы два воркера (или два процесса) не взяли одну задачу
+        self._db.execute("BEGIN IMMEDIATE")
+        try:
+            row = self._db.execute(
+                "SELECT id FROM pipeline_jobs WHERE status = 'queued' ORDER BY created_at LIMIT 1"
+            ).fetchone()
+            if row is not None:
+                self._db.execute(
+                    "UPDATE pipeline_jobs SET status = 'running', attempts = attempts + 1, updated_at = ?"
+                    " WHERE id = ?",
+                    (time.time(), row["id"]),
+                )
+            self._db.execute("COMMIT")
+        except Exception:
+            self._db.execute("ROLLBACK")
+            raise
+        return self.get(row["id"]) if row is not None else None
+
+    def cancel(self, job_id: str) -> bool:
+        """Отменить задачу: queued — сразу, running — выставить её cancel. False — отменять нечего."""
+        cur = self._db.execute(
+            "UPDATE pipeline_jobs SET status = 'cancelled', stage = 'cancelled', updated_at = ?"
+            " WHERE id = ? AND status = 'queued'",
+            (time.time(), job_id),
+        )
+        if cur.rowcount:
+            return True
+        event = self._cancel_events.get(job_id)
+        if event is None:
+            return False
+        event.set()
+        return True
+
+    def _finish(
+        self,
+        job_id: str,
+        result: Optional[dict] = None,
+        error: Optional[Any] = None,
+        status: Optional[str] = None,
+        error_code: Optional[int] = None,
+    ):
+        status = status or ("failed" if error is not None else "succeeded")
+        self._db.execute(
+            "UPDATE pipeline_jobs SET status = ?, stage = ?, result = ?, error = ?, error_code = ?, updated_at = ?"
+            " WHERE id = ?",
+            (
+                status,
+                "done" if status == "succeeded" else status,
+                json.dumps(result, ensure_ascii=False) if result is not None else None,
+                json.dumps(error, ensure_ascii=False) if error is not None else None,
+                error_code,
+                time.time(),
+                job_id,
+            ),
+        )
+
+    def _recover(self):
+        # задачи с просроченной арендой (владелец упал) — обратно в очередь; попытка уже посчитана при claim
+        now = time.time()
+        expired = now - self.lease_sec
+        self._db.execute(
+            "UPDATE pipeline_jobs SET status = 'failed', stage = 'failed', error = ?, updated_at = ?"
+            " WHERE status = 'running' AND updated_at < ? AND attempts >= ?",
+            (json.dumps("interrupted too many times"), now, expired, self.max_attempts),
+        )
+        cur = self._db.execute(
+            "UPDATE pipeline_jobs SET status = 'queued', updated_at = ? WHERE status = 'running' AND updated_at < ?",
+            (now, expired),
+        )
+        if cur.rowcount:
+            print(f"[jobs] resumed {cur.rowcount} interrupted job(s)")
+            if self._wakeup is not None:
+                self._wakeup.set()
+
+    async def _heartbeat(self):
+        # продлеваем аренду своих running-задач и подбираем просроченные чужие
+        while True:
+            ids = list(self._cancel_events)
+            if ids:
+                self._db.execute(
+                    f"UPDATE pipeline_jobs SET updated_at = ? WHERE status = 'running'"
+                    f" AND id IN ({','.join('?' * len(ids))})",
+                    (time.time(), *ids),
+                )
+            self._recover()
+            await asyncio.sleep(self.lease_sec / 3)
+
+    async def _worker(self, n: int):
+        while True:
+            job = self._claim()
+            if job is None:
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=5)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            print(f"[jobs] worker {n} took {job['id']} ({job['kind']}, attempt {job['attempts']})")
+            job["cancel"] = self._cancel_events[job["id"]] = asyncio.Event()
+            try:
+                result = await self._handlers[job["kind"]](self, job)
+            except asyncio.CancelledError:
+                # остановка сервиса: задача останется running и, когда истечёт аренда,
+                # продолжится после рестарта (или в другом процессе)
+                raise
+            except Exception as e:
+                cancelled = job["cancel"].is_set()
+                print(f"[jobs] {job['id']} {'cancelled' if cancelled else 'failed'}: {e}")
+                self._finish(
+                    job["id"],
+                    error=getattr(e, "detail", None) or str(e),
+                    status="cancelled" if cancelled else "failed",
+                    error_code=getattr(e, "code", None),
+                )
+                continue
+            finally:
+                self._cancel_events.pop(job["id"], None)
+            self._finish(job["id"], result=result)
+
+    def start(self):
+        self._wakeup = asyncio.Event()
+        self._tasks = [asyncio.create_task(self._worker(i)) for i in range(self.workers)]
+        self._tasks.append(asyncio.create_task(self._heartbeat()))
+
+    async def stop(self):
+        for t in self._tasks:
+            t.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    def stats(self) -> Dict[str, Any]:
+        by_status = {
+            r["status"]: r["n"]
+            for r in self._db.execute("SELECT status, COUNT(*) AS n FROM pipeline_jobs GROUP BY status")
+        }
+        return {"workers": self.workers, "lease_sec": self.lease_sec, "by_status": by_status}
+
+
+job_queue = JobQueue(
+    PIPELINE_DB_PATH,
+    workers=PIPELINE_WORKERS,
+    max_attempts=PIPELINE_MAX_ATTEMPTS,
+    lease_sec=PIPELINE_LEASE_SEC,
+)
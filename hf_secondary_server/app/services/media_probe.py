@@ -0,0 +1,137 @@
+# app/services/media_probe.py
+import os
+import json
+import time
+import sqlite3
+from collections import OrderedDict
+from dataclasses import dataclass, asdict
+
+from app.config import PROBE_CACHE_MAX_ENTRIES, PROBE_CACHE_PATH
+from app.services.frame_backends import frame_backend
+
+
+@dataclass(frozen=True)
+class MediaMeta:
+    width: int
+    height: int
+    duration: float
+    fps: int
+    codec: str | None = None
+    size: int | None = None
+
+    def as_dict(self) -> dict:
+        return asdict(self)
+
+
+def _fps(rate: str | None) -> int:
+    if not rate:
+        return 0
+    if "/" in rate:
+        num, den = map(int, rate.split("/"))
+        return round(num / den) if den else num
+    return int(float(rate))
+
+
+def parse_ffprobe(data: dict) -> MediaMeta:
+    """ffprobe -print_format json -show_format -show_streams → MediaMeta (первый видеопоток)."""
+    stream = next((s for s in data.get("streams") or [] if s.get("codec_type") == "video"), None)
+    if stream is None:
+        raise ValueError("no video stream")
+    fmt = data.get("format") or {}
+    duration = fmt.get("duration") or stream.get("duration")
+    size = fmt.get("size")
+    return MediaMeta(
+        width=int(stream["width"]),
+        height=int(stream["height"]),
+        duration=float(duration) if duration is not None else 0.0,
+        fps=_fps(stream.get("r_frame_rate")),
+        codec=stream.get("codec_name"),
+        size=int(size) if size and str(size).isdigit() else None,
+    )
+
+
+def cache_key(url: str, headers) -> str | None:
+    """Ключ кэша для URL: ETag, иначе полный размер (Content-Range/Content-Length). None — не кэшировать."""
+    etag = headers.get("ETag")
+    if etag:
+        return f"{url}#etag={etag}"
+    content_range = headers.get("Content-Range")
+    if content_range:
+        # ответ на Range: Content-Length — длина куска, полный размер — после "/"
+        length = content_range.rpartition("/")[2]
+    else:
+        length = headers.get("Content-Length", "")
+    return f"{url}#len={length}" if length.isdigit() else None
+
+
+class MediaProbeCache:
+    """LRU метаданных в памяти + необязательная копия в SQLite (path пустой — только память)."""
+
+    def __init__(self, max_entries: int = 1024, path: str = ""):
+        self.max_entries = max_entries
+        self._mem: "OrderedDict[str, MediaMeta]" = OrderedDict()
+        self._db = None
+        if path:
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+            self._db = sqlite3.connect(path, isolation_level=None, check_same_thread=False)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS media_meta (key TEXT PRIMARY KEY, meta TEXT NOT NULL, created_at REAL NOT NULL)"
+            )
+        self.hits = 0
+        self.misses = 0
+        self.probes = 0
+
+    def get(self, key: str) -> MediaMeta | None:
+        meta = self._mem.get(key)
+        if meta is None and self._db is not None:
+            row = self._db.execute("SELECT meta FROM media_meta WHERE key = ?", (key,)).fetchone()
+            if row is not None:
+                meta = MediaMeta(**json.loads(row[0]))
+                self._remember(key, meta)
+        if meta is None:
+            self.misses += 1
+            return None
+        self._mem.move_to_end(key)
+        self.hits += 1
+        return meta
+
+    def _remember(self, key: str, meta: MediaMeta):
+        self._mem[key] = meta
+        self._mem.move_to_end(key)
+        while len(self._mem) > self.max_entries:
+            self._mem.popitem(last=False)
+
+    def put(self, key: str, meta: MediaMeta):
+        self._remember(key, meta)
+        if self._db is not None:
+            self._db.execute(
+                "INSERT OR REPLACE INTO media_meta (key, meta, created_at) VALUES (?, ?, ?)",
+                (key, json.dumps(meta.as_dict()), time.time()),
+            )
+
+    def stats(self) -> dict:
+        return {
+            "entries": len(self._mem),
+            "hits": self.hits,
+            "misses": self.misses,
+            "probes": self.probes,
+            "persistent": self._db is not None,
+        }
+
+
+probe_cache = MediaProbeCache(max_entries=PROBE_CACHE_MAX_ENTRIES, path=PROBE_CACHE_PATH)
+
+
+async def probe(src: str, key: str | None = None) -> MediaMeta:
+    """Метаданные файла или URL через бэкенд кадров: ffprobe (subprocess) или av.open (pyav).
+    key — ключ кэша (см. cache_key); None — без кэша."""
+    if key is not None:
+        cached = probe_cache.get(key)
+        if cached is not None:
+            return cached
+    probe_cache.probes += 1
+    meta = parse_ffprobe(await frame_backend.probe(src))
+    if key is not None:
+        probe_cache.put(key, meta)
+    return meta
@@ -0,0 +1,156 @@
+# app/services/pipeline.py
+import os
+import asyncio
+import httpx
+from typing import Awaitable, Callable, Optional
+
+from app.config import WORKDIR
+from app.services.video import (
+    ensure_workdir, normalize_video_url, preflight_video_url,
+    grab_last_frame, remove_files,
+)
+from app.services.s3_uploader import upload_file
+from app.services.frame_cache import FrameEntry, frame_cache
+from app.services.higgsfield import submit_minimax_i2v, poll_job_set
+
+
+class PipelineFailed(RuntimeError):
+    """Ошибка шага пайплайна; code — HTTP-код ошибки (попадает в error_code задачи)."""
+
+    def __init__(self, detail, code: int = 502):
+        super().__init__(detail if isinstance(detail, str) else detail.get("msg", str(detail)))
+        self.detail = detail
+        self.code = code
+
+
+async def check_video_url(safe_url: str) -> dict:
+    """preflight URL предыдущего видео; PipelineFailed(code=400), если это не доступное видео."""
+    try:
+        pf = await preflight_video_url(safe_url)
+    except httpx.HTTPError as e:
+        raise PipelineFailed({
+            "msg": f"previous_video_url недоступен: {e}",
+            "checked_url": safe_url,
+        }, code=400)
+    print("preflight previous_video_url →", pf)
+    if not pf.get("ok"):
+        raise PipelineFailed({
+            "msg": "previous_video_url не выглядит как доступное видео",
+            "checked_url": safe_url,
+            "check": pf
+        }, code=400)
+    return pf
+
+
+async def run_continue(
+    job_id: str,
+    previous_video_url: str,
+    previous_prompt: str,
+    next_prompt: str,
+    checkpoint: Optional[dict] = None,
+    on_stage: Optional[Callable[[str, Optional[dict]], Awaitable[None]]] = None,
+    cancel: Optional[asyncio.Event] = None,
+) -> dict:
+    """Скачать видео → последний кадр → Spaces → image2video/minimax → дождаться результата.
+
+    checkpoint — сохранённое состояние после отправки в Higgsfield: при повторном запуске
+    (рестарт сервиса) job-set не отправляется заново, а только дожидается. До отправки в нём
+    может лежать preflight — результат проверки URL, уже сделанной при постановке задачи.
+    on_stage(stage, checkpoint) вызывается перед каждым шагом; cancel прерывает ожидание генерации.
+    """
+    async def stage(name: str, state: Optional[dict] = None):
+        if on_stage is not None:
+            await on_stage(name, state)
+
+    state = dict(checkpoint or {})
+    safe_url = normalize_video_url(previous_video_url)
+
+    if not state.get("job_set_id"):
+        ensure_workdir()
+        await stage("preflight")
+        pf = state.get("preflight") or await check_video_url(safe_url)
+
+        # тот же кадр уже резали и заливали (повтор продолжения) — сразу к отправке
+        frame_key = pf.get("meta_key")
+        cached = frame_cache.get(frame_key)
+        if cached is not None:
+            frame_image_url, media, t, frame_source = cached.image_url, cached.meta, cached.frame_time, "cache"
+        else:
+            frame_path = os.path.join(WORKDIR, f"{job_id}_last.jpg")
+            try:
+                await stage("extract_frame")
+                media, t, frame_source = await grab_last_frame(
+                    safe_url, frame_path, job_id, ranges=pf.get("ranges"), meta_key=frame_key
+                )
+
+                await stage("upload_frame")
+                try:
+                    frame_image_url = await upload_file(frame_path, prefix="frames")
+                except Exception as e:
+                    raise PipelineFailed(f"upload to Spaces failed: {e}")
+            finally:
+                remove_files(frame_path)
+            frame_cache.put(frame_key, FrameEntry(frame_image_url, media, t, frame_source))
+
+        prompt_text = (
+            f"In first part of video was {previous_prompt}, "
+            f"generate new part with {next_prompt}"
+        )
+
+        params = {
+            "duration": 10,
+            "resolution": "768",
+            "enhance_prompt": True,
+            "input_image": {"type": "image_url", "image_url": frame_image_url},
+            "prompt": prompt_text,
+        }
+
+        await stage("submit")
+        try:
+            submit = await submit_minimax_i2v(params)
+        except Exception as e:
+            raise PipelineFailed(f"submit to Higgsfield failed: {e}")
+
+        job_set_id = submit.get("id")
+        if not job_set_id:
+            raise PipelineFailed("No job_set_id in submit response", code=500)
+
+        state = {
+            "job_set_id": job_set_id,
+            "frame_image_url": frame_image_url,
+            "video_meta": media.as_dict(),
+            "last_frame_time": round(t, 3),
+            "last_frame_source": frame_source,
+            "higgsfield_params": params,
+        }
+
+    await stage("generate", state)
+    try:
+        js = await poll_job_set(state["job_set_id"], cancel=cancel)
+    except Exception as e:
+        raise PipelineFailed(f"poll job failed: {e}")
+
+    jobs = js.get("jobs") or []
+    status = jobs[0].get("status") if jobs else "unknown"
+    if status != "completed":
+        raise PipelineFailed(f"Job did not complete (status={status})", code=500)
+
+    try:
+        new_video_url = jobs[0]["results"]["raw"]["url"]
+    except Exception as e:
+        raise PipelineFailed(f"parse results failed: {e}", code=500)
+
+    return {
+        "new_video_url": new_video_url,
+        "used_prompt": next_prompt,
+        "job_set_id": state["job_set_id"],
+        "frame_image_url": state["frame_image_url"],
+        "meta": {
+            "previous_video_url": safe_url,
+            "previous_prompt": previous_prompt,
+            "video_meta": state["video_meta"],
+            "last_frame_time": state["last_frame_time"],
+            "last_frame_source": state.get("last_frame_source"),
+            "higgsfield_params": state["higgsfield_params"],
+        },
+    }
@@ -1,14 +1,18 @@
 import os
-import asyncio
 import json
+import asyncio
+import hashlib
 from datetime import datetime
 from miniopy_async import Minio
 from miniopy_async.error import S3Error
 from app.config import (
     SPACES_ENDPOINT, SPACES_REGION, SPACES_BUCKET,
-    SPACES_ACCESS_KEY, SPACES_SECRET_KEY, SPACES_CDN_BASE
+    SPACES_ACCESS_KEY, SPACES_SECRET_KEY, SPACES_CDN_BASE, SPACES_KEY_MODE
 )
 
+_HASH_CHUNK = 1024 * 1024
+_KNOWN_KEYS_MAX = 4096
+
 def _endpoint_host(endpoint: str) -> str:
     return endpoint.replace("https://", "").replace("http://", "")
 
@@ -46,45 +50,142 @@ def _key_for_local_file(local_path: str, prefix: str = "frames") -> str:
     ts = datetime.utcnow().strftime("%Y%m%dT%H%M%SZ")
     return f"{prefix}/{ts}_{base}"
 
-async def upload_file_async(local_path: str, prefix: str = "frames") -> str:
+def _sha256_file(local_path: str) -> str:
+    h = hashlib.sha256()
+    with open(local_path, "rb") as f:
+        for chunk in iter(lambda: f.read(_HASH_CHUNK), b""):
+            h.update(chunk)
+    return h.hexdigest()
 
-    client = Minio(
-        endpoint=_endpoint_host(SPACES_ENDPOINT),
-        access_key=SPACES_ACCESS_KEY,
-        secret_key=SPACES_SECRET_KEY,
-        secure=SPACES_ENDPOINT.startswith("https://"),
-        region=SPACES_REGION,
-    )
+async def _content_key(local_path: str, prefix: str = "frames") -> str:
+    """Ключ по содержимому: {prefix}/{sha256}{ext} — одинаковые байты → один объект.
 
-    await _ensure_bucket(client)
-    await _ensure_public_policy(client)
-
-    key = _key_for_local_file(local_path, prefix=prefix)
-    size = os.path.getsize(local_path)
+    Хэш считается отдельным проходом до заливки, а не на лету в put_object: ключ нужен
+    до начала PUT (по нему проверяется, есть ли объект). Второй проход дешёвый — файлы
+    небольшие и после хэширования уже лежат в page cache.
+    """
+    digest = await asyncio.to_thread(_sha256_file, local_path)
+    ext = os.path.splitext(local_path)[1].lower()
+    return f"{prefix}/{digest}{ext}"
 
+def _content_type(local_path: str) -> str:
     lp = local_path.lower()
     if lp.endswith((".jpg", ".jpeg")):
-        content_type = "image/jpeg"
-    elif lp.endswith(".png"):
-        content_type = "image/png"
-    elif lp.endswith(".mp4"):
-        content_type = "video/mp4"
-    else:
-        content_type = "application/octet-stream"
-
-    print(f"[spaces] upload start bucket={SPACES_BUCKET} key={key} size={size} ct={content_type}")
-    with open(local_path, "rb") as data:
-        await client.put_object(
-            SPACES_BUCKET,
-            key,
-            data,
-            size,
-            content_type=content_type,
-        )
-    print(f"[spaces] upload done: {key}")
-
-    cdn = SPACES_CDN_BASE.rstrip("/")
-    return f"{cdn}/{key}"
-
-def upload_file(local_path: str, prefix: str = "frames") -> str:
-    return asyncio.run(upload_file_async(local_path, prefix=prefix))
+        return "image/jpeg"
+    if lp.endswith(".png"):
+        return "image/png"
+    if lp.endswith(".mp4"):
+        return "video/mp4"
+    return "application/octet-stream"
+
+class SpacesUploader:
+    """Один Minio-клиент (и его пул соединений) на процесс.
+
+    Проверка бакета и public-read политики — один раз, при старте или первой заливке,
+    а не перед каждым put_object.
+    """
+
+    def __init__(self):
+        self._client: Minio | None = None
+        self._ready = False
+        self._lock = asyncio.Lock()
+        # ключи, про которые уже известно, что объект лежит в бакете (без повторного HEAD)
+        self._known: set[str] = set()
+        self.uploads = 0
+        self.dedup_hits = 0
+        self.bytes_skipped = 0
+
+    @property
+    def client(self) -> Minio:
+        if self._client is None:
+            self._client = Minio(
+                endpoint=_endpoint_host(SPACES_ENDPOINT),
+                access_key=SPACES_ACCESS_KEY,
+                secret_key=SPACES_SECRET_KEY,
+                secure=SPACES_ENDPOINT.startswith("https://"),
+                region=SPACES_REGION,
+            )
+        return self._client
+
+    async def bootstrap(self):
+        if self._ready:
+            return
+        async with self._lock:
+            if self._ready:
+                return
+            await _ensure_bucket(self.client)
+            await _ensure_public_policy(self.client)
+            self._ready = True
+
+    async def _exists(self, key: str) -> bool:
+        if key in self._known:
+            return True
+        try:
+            await self.client.stat_object(SPACES_BUCKET, key)
+        except S3Error as e:
+            if e.code not in ("NoSuchKey", "NoSuchObject", "NotFound"):
+                print(f"[spaces] stat_object warn: {e}")
+            return False
+        except Exception as e:
+            # сеть/транспорт: проверка лишь оптимизация — идём на обычный PUT
+            print(f"[spaces] stat_object warn: {e!r}")
+            return False
+        self._remember(key)
+        return True
+
+    def _remember(self, key: str):
+        if len(self._known) >= _KNOWN_KEYS_MAX:
+            self._known.clear()
+        self._known.add(key)
+
+    async def upload(self, local_path: str, prefix: str = "frames") -> str:
+        await self.bootstrap()
+
+        size = os.path.getsize(local_path)
+        cdn = SPACES_CDN_BASE.rstrip("/")
+        if SPACES_KEY_MODE == "hash":
+            key = await _content_key(local_path, prefix=prefix)
+            if await self._exists(key):
+                self.dedup_hits += 1
+                self.bytes_skipped += size
+                print(f"[spaces] upload skipped, same content already stored: {key}")
+                return f"{cdn}/{key}"
+        else:
+            key = _key_for_local_file(local_path, prefix=prefix)
+        content_type = _content_type(local_path)
+
+        print(f"[spaces] upload start bucket={SPACES_BUCKET} key={key} size={size} ct={content_type}")
+        with open(local_path, "rb") as data:
+            await self.client.put_object(
+                SPACES_BUCKET,
+                key,
+                data,
+                size,
+                content_type=content_type,
+            )
+        self.uploads += 1
+        if SPACES_KEY_MODE == "hash":
+            self._remember(key)
+        print(f"[spaces] upload done: {key}")
+
+        return f"{cdn}/{key}"
+
+    async def aclose(self):
+        if self._client is not None:
+            await self._client.close_session()
+        self._client = None
+        self._ready = False
+
+    def stats(self) -> dict:
+        return {
+            "uploads": self.uploads,
+            "dedup_hits": self.dedup_hits,
+            "bytes_skipped": self.bytes_skipped,
+            "key_mode": SPACES_KEY_MODE,
+            "bootstrapped": self._ready,
+        }
+
+uploader = SpacesUploader()
+
+async def upload_file(local_path: str, prefix: str = "frames") -> str:
+    return await uploader.upload(local_path, prefix=prefix)
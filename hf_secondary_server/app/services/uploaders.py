@@ -1,11 +1,11 @@
 import os
 import httpx
 
-def upload_catbox(file_path: str) -> str:
+async def upload_catbox(file_path: str) -> str:
 
-    with httpx.Client(timeout=60) as c:
+    async with httpx.AsyncClient(timeout=60) as c:
         with open(file_path, "rb") as f:
-            r = c.post(
+            r = await c.post(
                 "https://catbox.moe/user/api.php",
                 data={"reqtype": "fileupload"},
                 files={"fileToUpload": (os.path.basename(file_path), f, "image/jpeg")},
@@ -1,91 +1,173 @@
 # app/services/video.py
 import os
-import shlex
+import time
+import anyio
 import httpx
 import subprocess
-import shutil
 
-from app.config import WORKDIR
+from app.config import WORKDIR, FRAME_REMOTE_SEEK
+from app.services.media_probe import MediaMeta, cache_key, probe, probe_cache
+from app.services.frame_backends import FrameExtractionError, frame_backend
+
+# скачивания с CDN — отдельный пул без заголовков Higgsfield
+_client: httpx.AsyncClient | None = None
+
+
+def client() -> httpx.AsyncClient:
+    global _client
+    if _client is None or _client.is_closed:
+        _client = httpx.AsyncClient(timeout=httpx.Timeout(30, read=None), follow_redirects=True)
+    return _client
+
+
+async def aclose():
+    global _client
+    if _client is not None and not _client.is_closed:
+        await _client.aclose()
+    _client = None
+
+
+def cleanup_workdir(max_age_sec: float = 3600):
+    """Удалить из WORKDIR файлы старше max_age_sec: свежие могут принадлежать другому процессу."""
+    cutoff = time.time() - max_age_sec
+    removed = 0
+    for root, _, files in os.walk(WORKDIR):
+        for name in files:
+            path = os.path.join(root, name)
+            try:
+                if os.path.getmtime(path) < cutoff:
+                    os.remove(path)
+                    removed += 1
+            except OSError as e:
+                print(f"[workdir] cleanup {path} warn: {e}")
+    if removed:
+        print(f"[workdir] removed {removed} stale files")
+    try:
+        os.makedirs(WORKDIR, exist_ok=True)
+    except Exception as e:
+        print(f"[workdir] recreate warn: {e}")
 
+def remove_files(*paths: str):
+    for path in paths:
+        try:
+            if os.path.exists(path):
+                os.remove(path)
+        except Exception as e:
+            print(f"[cleanup] remove {path} warn: {e}")
 
-def sh(cmd: str):
-    print(f"$ {cmd}")
-    subprocess.check_call(shlex.split(cmd))
+async def get_meta(path: str) -> MediaMeta:
+    return await probe(path)
 
 
-def _ffprobe(path: str, field: str) -> str:
-    return subprocess.check_output(
-        ["ffprobe", "-v", "error", "-show_entries", field, "-of", "default=nw=1:nk=1", path]
-    ).decode().strip()
+async def extract_last_frame(video_path: str, out_path: str, duration: float | None = None) -> float:
+    if duration is None:
+        duration = (await get_meta(video_path)).duration
+    return await frame_backend.extract_last(video_path, out_path, duration)
 
-def cleanup_workdir():
-    if os.path.isdir(WORKDIR):
-        try:
-            shutil.rmtree(WORKDIR)
-        except Exception as e:
-            print(f"[workdir] cleanup warn: {e}")
-    try:
-        os.makedirs(WORKDIR, exist_ok=True)
-    except Exception as e:
-        print(f"[workdir] recreate warn: {e}")
 
-def get_meta(path: str):
-    width = int(_ffprobe(path, "stream=width"))
-    height = int(_ffprobe(path, "stream=height"))
-    duration = float(_ffprobe(path, "format=duration"))
-    fps_str = _ffprobe(path, "stream=r_frame_rate")
-    if "/" in fps_str:
-        num, den = map(int, fps_str.split("/"))
-        fps = round(num / den) if den else num
-    else:
-        fps = int(float(fps_str))
-    return width, height, duration, fps
+async def extract_last_frame_remote(url: str, out_path: str, duration: float) -> float:
+    # по URL бэкенд читает индекс контейнера и последний GOP через Range, не всё видео
+    return await frame_backend.extract_last(url, out_path, duration)
 
 
-def extract_last_frame(video_path: str, out_path: str) -> float:
-    _, _, duration, _ = get_meta(video_path)
-    ts = max(0.0, duration - 0.1 if duration > 0.1 else duration - 0.05)
-    sh(f'ffmpeg -ss {ts:.3f} -i "{video_path}" -frames:v 1 -update 1 -y "{out_path}"')
-    return ts
+async def _range_head(url: str) -> httpx.Response:
+    """GET bytes=0-0 без чтения тела: если источник игнорирует Range и отвечает 200 всем видео,
+    тело не качается — поток закрывается сразу после заголовков."""
+    async with client().stream("GET", url, headers={"Range": "bytes=0-0"}) as r:
+        return r
 
 
-def ensure_workdir():
-    os.makedirs(WORKDIR, exist_ok=True)
+async def range_probe(url: str) -> tuple[bool, str | None]:
+    """GET bytes=0-0: (поддерживает ли источник Range, ключ кэша метаданных по ETag/размеру)."""
+    r = await _range_head(url)
+    return r.status_code == 206, cache_key(url, r.headers)
 
 
+async def head_key(url: str) -> str | None:
+    """Ключ кэша по HEAD (ETag/размер) — когда range-проба не нужна."""
+    r = await client().head(url)
+    return cache_key(url, r.headers) if r.status_code < 400 else None
 
-def normalize_video_url(url: str) -> str:
-    return url[:-1] if url.endswith("/") else url
 
+async def grab_last_frame(
+    url: str,
+    out_path: str,
+    work_id: str,
+    ranges: bool | None = None,
+    meta_key: str | None = None,
+) -> tuple[MediaMeta, float, str]:
+    """Последний кадр видео по URL. Вернёт (MediaMeta, frame_time, source).
+
+    При поддержке Range (и FRAME_REMOTE_SEEK) кадр достаётся с хвоста по сети (source="range"),
+    иначе — или если это не удалось — видео скачивается целиком (source="download").
+    Метаданные кэшируются по meta_key (URL + ETag/размер); без него ключ берётся из range-пробы.
+    При выключенном FRAME_REMOTE_SEEK range-проба не делается: видео всё равно скачивается.
+    """
+    if FRAME_REMOTE_SEEK and (ranges is None or (meta_key is None and ranges)):
+        try:
+            probed_ranges, probed_key = await range_probe(url)
+            ranges = probed_ranges if ranges is None else ranges
+            meta_key = meta_key or probed_key
+        except httpx.HTTPError as e:
+            print(f"[frame] range probe failed, full download: {e}")
+            ranges = False
+
+    if FRAME_REMOTE_SEEK and ranges:
+        try:
+            meta = await probe(url, meta_key)
+            ts = await extract_last_frame_remote(url, out_path, meta.duration)
+            return meta, ts, "range"
+        except (subprocess.CalledProcessError, ValueError, FrameExtractionError) as e:
+            print(f"[frame] tail extraction over Range failed, full download: {e}")
+
+    local_video = os.path.join(WORKDIR, f"{work_id}.mp4")
+    try:
+        meta = await download_video(url, local_video, meta_key)
+        ts = await extract_last_frame(local_video, out_path, meta.duration)
+        return meta, ts, "download"
+    finally:
+        remove_files(local_video)
 
-def preflight_video_url(url: str) -> dict:
 
-    with httpx.Client(timeout=30, follow_redirects=True) as c:
-        r = c.head(url)
-        if r.status_code >= 400:
-            r = c.get(url, headers={"Range": "bytes=0-0"})
-        ct = r.headers.get("Content-Type", "").lower()
-        cl = r.headers.get("Content-Length", "")
-        ok_type = ("video/" in ct) or url.lower().endswith(".mp4")
-        ok_size = (cl.isdigit() and int(cl) > 1024) or r.status_code == 206
-        return {
-            "ok": (r.status_code < 400) and ok_type and ok_size,
-            "status_code": r.status_code,
-            "content_type": ct,
-            "content_length": cl,
-        }
+def ensure_workdir():
+    os.makedirs(WORKDIR, exist_ok=True)
 
 
-def download_video(url: str, out_path: str):
 
-    with httpx.Client(timeout=None, follow_redirects=True) as c:
-        with c.stream("GET", url) as r:
-            r.raise_for_status()
-            with open(out_path, "wb") as f:
-                for chunk in r.iter_bytes():
-                    f.write(chunk)
-    _ = _ffprobe(out_path, "stream=width")
+def normalize_video_url(url: str) -> str:
+    return url[:-1] if url.endswith("/") else url
 
 
-def curl_download(url: str, out_path: str):
-    sh(f'curl -L "{url}" -o "{out_path}"')
+async def preflight_video_url(url: str) -> dict:
+
+    c = client()
+    r = await c.head(url)
+    if r.status_code >= 400:
+        r = await _range_head(url)
+    ct = r.headers.get("Content-Type", "").lower()
+    cl = r.headers.get("Content-Length", "")
+    ok_type = ("video/" in ct) or url.lower().endswith(".mp4")
+    ok_size = (cl.isdigit() and int(cl) > 1024) or r.status_code == 206
+    return {
+        "ok": (r.status_code < 400) and ok_type and ok_size,
+        "status_code": r.status_code,
+        "content_type": ct,
+        "content_length": cl,
+        "ranges": r.status_code == 206 or "bytes" in r.headers.get("Accept-Ranges", "").lower(),
+        "meta_key": cache_key(url, r.headers),
+    }
+
+
+async def download_video(url: str, out_path: str, meta_key: str | None = None) -> MediaMeta:
+
+    async with client().stream("GET", url) as r:
+        r.raise_for_status()
+        async with await anyio.open_file(out_path, "wb") as f:
+            async for chunk in r.aiter_bytes():
+                await f.write(chunk)
+    # проба скачанного файла всегда (заодно проверяет, что скачалось видео);
+    # кэш под ключом URL только пополняется — он нужен, чтобы пропускать пробы по сети
+    meta = await probe(out_path)
+    if meta_key is not None:
+        probe_cache.put(meta_key, meta)
+    return meta
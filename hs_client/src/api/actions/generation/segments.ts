@@ -6,12 +6,59 @@ export const listSegments = async (projectId: string): Promise<StorySegment[]> =
   return data;
 };
 
-export const continueStory = async (params: {
+type ContinueJob = {
   project_id: string;
-  next_prompt: string;
-}): Promise<StorySegment> => {
-  const { data } = await axiosInstance.post<StorySegment>(endpoints.GENERATOR.CONTINUE, params);
-  return data;
+  pipeline_job_id: string;
+  status: string;
+  stage?: string | null;
+};
+
+const CONTINUE_POLL_MS = 5000;
+// дольше генерация части не идёт: дальше считаем задачу потерянной
+const CONTINUE_TIMEOUT_MS = 15 * 60 * 1000;
+
+export class ContinueTimeoutError extends Error {
+  constructor(public readonly pipelineJobId: string) {
+    super("Scene generation timed out");
+    this.name = "ContinueTimeoutError";
+  }
+}
+
+const delay = (ms: number, signal?: AbortSignal) =>
+  new Promise<void>((resolve, reject) => {
+    if (signal?.aborted) return reject(signal.reason);
+    const timer = setTimeout(() => {
+      signal?.removeEventListener("abort", onAbort);
+      resolve();
+    }, ms);
+    const onAbort = () => {
+      clearTimeout(timer);
+      reject(signal?.reason);
+    };
+    signal?.addEventListener("abort", onAbort, { once: true });
+  });
+
+// бэкенд ставит генерацию в очередь (202) — опрашиваем continue-status, пока не вернётся часть,
+// не дольше timeoutMs (ContinueTimeoutError) и до отмены через signal
+export const continueStory = async (
+  params: {
+    project_id: string;
+    next_prompt: string;
+  },
+  opts: { signal?: AbortSignal; timeoutMs?: number } = {},
+): Promise<StorySegment> => {
+  const { signal, timeoutMs = CONTINUE_TIMEOUT_MS } = opts;
+  const { data: job } = await axiosInstance.post<ContinueJob>(endpoints.GENERATOR.CONTINUE, params, { signal });
+  const deadline = Date.now() + timeoutMs;
+  while (Date.now() < deadline) {
+    await delay(CONTINUE_POLL_MS, signal);
+    const { data } = await axiosInstance.get<StorySegment | ContinueJob>(
+      endpoints.GENERATOR.CONTINUE_STATUS(params.project_id, job.pipeline_job_id),
+      { signal },
+    );
+    if ("new_video_url" in data) return data;
+  }
+  throw new ContinueTimeoutError(job.pipeline_job_id);
 };
 
 export const deleteLastSegment = async (projectId: string): Promise<void> => {
@@ -18,6 +18,8 @@ export const endpoints = {
   GENERATOR: {
     LIST: (projectId: string) => `api/generator/?project_id=${projectId}`,
     CONTINUE: "api/generator/continue/",
+    CONTINUE_STATUS: (projectId: string, jobId: string) =>
+      `api/generator/continue-status/?project_id=${projectId}&job_id=${jobId}`,
     DELETE_LAST: "api/generator/delete-last/",
     ASSEMBLE: "api/generator/assemble/",
   },
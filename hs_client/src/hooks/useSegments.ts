@@ -2,7 +2,12 @@
 /* eslint-disable @typescript-eslint/no-explicit-any */
 import { useCallback, useEffect, useMemo, useRef, useState } from "react";
 import type { Scene, StorySegment } from "@/shared/types/StorySegment";
-import { listSegments, continueStory, deleteLastSegment } from "@/api/actions/generation/segments";
+import {
+  listSegments,
+  continueStory,
+  deleteLastSegment,
+  ContinueTimeoutError,
+} from "@/api/actions/generation/segments";
 import { useGlobalAlert } from "@/context/globalAlertContext";
 
 // детерминированный id для initial
@@ -30,6 +35,7 @@ export const useSegments = (projectId: string, opts: UseSegmentsOpts) => {
   const [scenes, setScenes] = useState<Scene[]>([]);
   const [busy, setBusy] = useState(false); // флаг генерации/удаления
   const mounted = useRef(false);
+  const abortRef = useRef<AbortController | null>(null);
 
   const initialScene: Scene | null = useMemo(() => {
     if (!projectId || !initialVideoUrl) return null;
@@ -61,6 +67,7 @@ export const useSegments = (projectId: string, opts: UseSegmentsOpts) => {
     fetchAll();
     return () => {
       mounted.current = false;
+      abortRef.current?.abort();
     };
   }, [fetchAll]);
 
@@ -69,16 +76,28 @@ export const useSegments = (projectId: string, opts: UseSegmentsOpts) => {
   const generateNext = useCallback(
     async (nextPrompt: string) => {
       if (!projectId || !nextPrompt.trim()) return;
+      abortRef.current?.abort();
+      const controller = new AbortController();
+      abortRef.current = controller;
       setBusy(true);
       try {
-        const seg = await continueStory({ project_id: projectId, next_prompt: nextPrompt.trim() });
+        const seg = await continueStory(
+          { project_id: projectId, next_prompt: nextPrompt.trim() },
+          { signal: controller.signal },
+        );
         const scene = toScene(seg);
         setScenes((prev) => [...prev, scene]);
         showAlert("success", "New scene created");
       } catch (e: any) {
-        showAlert("error", e?.message || "Failed to generate scene");
+        if (controller.signal.aborted) return;
+        if (e instanceof ContinueTimeoutError) {
+          showAlert("error", "Scene generation is taking too long, try again later");
+        } else {
+          showAlert("error", e?.message || "Failed to generate scene");
+        }
       } finally {
-        setBusy(false);
+        if (abortRef.current === controller) abortRef.current = null;
+        if (!controller.signal.aborted) setBusy(false);
       }
     },
     [projectId, showAlert],
@@ -0,0 +1,46 @@
+import uuid
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("generator", "0001_initial"),
+        ("projects", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ContinueJob",
+            fields=[
+                (
+                    "id",
+                    models.UUIDField(
+                        default=uuid.uuid4,
+                        editable=False,
+                        primary_key=True,
+                        serialize=False,
+                    ),
+                ),
+                ("pipeline_job_id", models.CharField(max_length=255, unique=True)),
+                ("previous_video_url", models.URLField(max_length=1024)),
+                ("previous_prompt", models.TextField()),
+                (
+                    "position",
+                    models.PositiveIntegerField(help_text="Позиция будущей части"),
+                ),
+                ("created_at", models.DateTimeField(default=django.utils.timezone.now)),
+                (
+                    "project",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="continue_jobs",
+                        to="projects.project",
+                    ),
+                ),
+            ],
+        ),
+    ]
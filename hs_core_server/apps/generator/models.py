@@ -46,3 +46,25 @@ class StorySegment(models.Model):
 
     def __str__(self):
         return f"{self.project.name} — part #{self.position}"
+
+
+class ContinueJob(models.Model):
+    """
+    Задача пайплайна, поставленная через /continue/.
+    Привязывает pipeline_job_id к проекту и фиксирует состояние истории,
+    от которого пошла генерация (по нему создаётся часть по готовности).
+    """
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    project = models.ForeignKey(
+        Project, on_delete=models.CASCADE, related_name="continue_jobs", db_index=True
+    )
+    pipeline_job_id = models.CharField(max_length=255, unique=True)
+    previous_video_url = models.URLField(max_length=1024)
+    previous_prompt = models.TextField()
+    position = models.PositiveIntegerField(help_text="Позиция будущей части")
+
+    created_at = models.DateTimeField(default=timezone.now)
+
+    def __str__(self):
+        return f"{self.project.name} — continue job {self.pipeline_job_id}"
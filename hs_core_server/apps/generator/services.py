@@ -6,27 +6,30 @@ PIPELINE_BASE_URL = getattr(
     settings, "GENERATOR_PIPELINE_BASE_URL", "http://139.59.143.107:8001"
 )
 
-# Новый: раздельные таймауты
-# connect — короткий (быстро упасть, если хост недоступен),
-# read — None (ждать бесконечно, пока сервер не вернёт ответ).
+# Раздельные таймауты: connect — короткий (быстро упасть, если хост недоступен),
+# read — тоже конечный: /pipeline/continue только ставит задачу в очередь и сразу отвечает,
+# готовность видео клиент опрашивает через /api/generator/continue-status/.
 PIPELINE_CONNECT_TIMEOUT = getattr(
     settings, "GENERATOR_PIPELINE_CONNECT_TIMEOUT", 5
 )  # seconds
 PIPELINE_READ_TIMEOUT = getattr(
-    settings, "GENERATOR_PIPELINE_READ_TIMEOUT", None
-)  # None = бесконечно
+    settings, "GENERATOR_PIPELINE_READ_TIMEOUT", 30
+)  # seconds; None = бесконечно
 
 
 class PipelineError(RuntimeError):
-    pass
+    def __init__(self, message: str, status_code: int | None = None):
+        super().__init__(message)
+        self.status_code = status_code
 
 
-def _post_json(url: str, payload: dict) -> dict:
+def _request_json(method: str, url: str, payload: dict | None = None) -> dict:
     try:
-        resp = requests.post(
+        resp = requests.request(
+            method,
             url,
             json=payload,
-            timeout=(PIPELINE_CONNECT_TIMEOUT, PIPELINE_READ_TIMEOUT),  # <--- ключевое
+            timeout=(PIPELINE_CONNECT_TIMEOUT, PIPELINE_READ_TIMEOUT),
         )
         resp.raise_for_status()
     except requests.HTTPError as e:
@@ -34,9 +37,10 @@ def _post_json(url: str, payload: dict) -> dict:
             detail = resp.json()
         except Exception:
             detail = getattr(resp, "text", "")
-        raise PipelineError(f"HTTP error: {e} - {detail}") from e
+        raise PipelineError(
+            f"HTTP error: {e} - {detail}", status_code=resp.status_code
+        ) from e
     except requests.Timeout as e:
-        # сюда больше попадать не будем из-за read_timeout=None, но оставим на всякий
         raise PipelineError(f"Timeout: {e}") from e
     except requests.RequestException as e:
         raise PipelineError(f"Request error: {e}") from e
@@ -47,13 +51,36 @@ def _post_json(url: str, payload: dict) -> dict:
         raise PipelineError("Invalid JSON in pipeline response") from e
 
 
-def continue_pipeline(
+def _post_json(url: str, payload: dict) -> dict:
+    return _request_json("POST", url, payload)
+
+
+def _get_json(url: str) -> dict:
+    return _request_json("GET", url)
+
+
+def start_pipeline(
     previous_video_url: str, previous_prompt: str, next_prompt: str
 ) -> dict:
+    """
+    POST /pipeline/continue: пайплайн проверяет previous_video_url (400, если это не видео)
+    и ставит задачу в очередь. Возвращает задачу (job_id, status, stage, ...).
+    """
     url = f"{PIPELINE_BASE_URL}/pipeline/continue"
     payload = {
         "previous_video_url": previous_video_url,
         "previous_prompt": previous_prompt,
         "next_prompt": next_prompt,
     }
-    return _post_json(url, payload)
+    job = _post_json(url, payload)
+    if not job.get("job_id"):
+        raise PipelineError(f"Pipeline did not return job_id: {job}")
+    return job
+
+
+def get_pipeline_job(job_id: str) -> dict:
+    """
+    GET /pipeline/jobs/{job_id}: status (queued|running|succeeded|failed|cancelled), stage,
+    при succeeded — result (new_video_url, used_prompt, job_set_id, ...), при ошибке — error/error_code.
+    """
+    return _get_json(f"{PIPELINE_BASE_URL}/pipeline/jobs/{job_id}")
@@ -1,16 +1,16 @@
-from django.db import transaction
+from django.db import IntegrityError, transaction
 from django.shortcuts import get_object_or_404
 from rest_framework import status, viewsets
 from rest_framework.decorators import action
 from rest_framework.response import Response
 
-from apps.generator.models import StorySegment
+from apps.generator.models import ContinueJob, StorySegment
 from apps.generator.serializers import (
     ContinueRequestSerializer,
     DeleteLastRequestSerializer,
     StorySegmentSerializer,
 )
-from apps.generator.services import PipelineError, continue_pipeline
+from apps.generator.services import PipelineError, get_pipeline_job, start_pipeline
 from apps.generator.services_assemble import assemble_videos_to_media
 from apps.projects.models import Project
 
@@ -71,7 +71,8 @@ class StorySegmentViewSet(viewsets.ModelViewSet):
       - list можно фильтровать по project_id (?project_id=<uuid>)
       - destroy разрешён ТОЛЬКО для последней части проекта (иначе 400)
     Доп. экшены:
-      - POST /api/generator/continue/  (создать следующую часть)
+      - POST /api/generator/continue/  (поставить генерацию следующей части в очередь)
+      - GET  /api/generator/continue-status/ (опрос; по готовности создаёт часть)
       - POST /api/generator/delete-last/ (удалить последнюю часть проекта)
     """
 
@@ -113,8 +114,10 @@ class StorySegmentViewSet(viewsets.ModelViewSet):
     @action(detail=False, methods=["post"], url_path="continue")
     def continue_story(self, request):
         """
-        Создаёт следующую часть истории.
+        Ставит генерацию следующей части истории в очередь пайплайна.
         body: { "project_id": "<uuid>", "next_prompt": "<text>" }
+        Ответ 202: { "project_id", "pipeline_job_id", "status", "stage" };
+        готовую часть отдаёт GET /api/generator/continue-status/.
         """
         ser = ContinueRequestSerializer(data=request.data)
         ser.is_valid(raise_exception=True)
@@ -134,12 +137,18 @@ class StorySegmentViewSet(viewsets.ModelViewSet):
             )
 
         try:
-            pipe_resp = continue_pipeline(
+            job = start_pipeline(
                 previous_video_url=previous_video_url,
                 previous_prompt=previous_prompt,
                 next_prompt=next_prompt,
             )
         except PipelineError as e:
+            # 4xx от пайплайна — плохой previous_video_url (preflight), это ошибка запроса
+            if e.status_code and 400 <= e.status_code < 500:
+                return Response(
+                    {"detail": f"Pipeline rejected request: {str(e)}"},
+                    status=status.HTTP_400_BAD_REQUEST,
+                )
             return Response(
                 {"detail": f"Pipeline error: {str(e)}"},
                 status=status.HTTP_502_BAD_GATEWAY,
@@ -147,7 +156,90 @@ class StorySegmentViewSet(viewsets.ModelViewSet):
         except Exception as e:
             return Response({"detail": f"Unexpected error: {str(e)}"}, status=500)
 
-        # ожидаемая схема ответа:
+        # привязка задачи к проекту и состояние, от которого она пошла
+        ContinueJob.objects.create(
+            project=project,
+            pipeline_job_id=job["job_id"],
+            previous_video_url=previous_video_url,
+            previous_prompt=previous_prompt,
+            position=next_position,
+        )
+
+        return Response(
+            {
+                "project_id": str(project.id),
+                "pipeline_job_id": job["job_id"],
+                "status": job.get("status"),
+                "stage": job.get("stage"),
+            },
+            status=status.HTTP_202_ACCEPTED,
+        )
+
+    @action(detail=False, methods=["get"], url_path="continue-status")
+    def continue_status(self, request):
+        """
+        GET /api/generator/continue-status/?project_id=<uuid>&job_id=<pipeline_job_id>
+        Пока задача идёт — 202 { status, stage }; готово — 201 с новой частью истории
+        (повторный запрос вернёт ту же часть с 200); failed/cancelled — 400 или 502.
+        Задача должна быть поставлена через /continue/ для этого проекта (иначе 404);
+        если история с тех пор изменилась (delete-last, другое продолжение) — 409.
+        """
+        project_id = request.query_params.get("project_id")
+        job_id = request.query_params.get("job_id")
+        if not project_id or not job_id:
+            return Response(
+                {"detail": "project_id and job_id are required"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        project = get_object_or_404(Project, id=project_id)
+        cont = ContinueJob.objects.filter(project=project, pipeline_job_id=job_id).first()
+        if cont is None:
+            return Response(
+                {"detail": f"Pipeline job {job_id} not found for this project"},
+                status=status.HTTP_404_NOT_FOUND,
+            )
+
+        try:
+            job = get_pipeline_job(job_id)
+        except PipelineError as e:
+            if e.status_code == 404:
+                return Response(
+                    {"detail": f"Pipeline job {job_id} not found"},
+                    status=status.HTTP_404_NOT_FOUND,
+                )
+            return Response(
+                {"detail": f"Pipeline error: {str(e)}"},
+                status=status.HTTP_502_BAD_GATEWAY,
+            )
+        except Exception as e:
+            return Response({"detail": f"Unexpected error: {str(e)}"}, status=500)
+
+        job_status = job.get("status")
+        if job_status in ("failed", "cancelled"):
+            error_code = job.get("error_code")
+            return Response(
+                {
+                    "detail": f"Pipeline job {job_id} {job_status}: {job.get('error')}",
+                    "status": job_status,
+                },
+                status=(
+                    status.HTTP_400_BAD_REQUEST
+                    if error_code and 400 <= error_code < 500
+                    else status.HTTP_502_BAD_GATEWAY
+                ),
+            )
+        if job_status != "succeeded":
+            return Response(
+                {
+                    "project_id": str(project.id),
+                    "pipeline_job_id": job_id,
+                    "status": job_status,
+                    "stage": job.get("stage"),
+                },
+                status=status.HTTP_202_ACCEPTED,
+            )
+
+        # ожидаемая схема result:
         # {
         #   "new_video_url": "...",
         #   "used_prompt": "...",
@@ -155,8 +247,9 @@ class StorySegmentViewSet(viewsets.ModelViewSet):
         #   "frame_image_url": "...",
         #   "meta": { ... }
         # }
+        pipe_resp = job.get("result") or {}
         new_video_url = pipe_resp.get("new_video_url")
-        used_prompt = pipe_resp.get("used_prompt", next_prompt)
+        used_prompt = pipe_resp.get("used_prompt") or ""
         job_set_id = pipe_resp.get("job_set_id")
         frame_image_url = pipe_resp.get("frame_image_url")
         meta = pipe_resp.get("meta")
@@ -167,20 +260,54 @@ class StorySegmentViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_502_BAD_GATEWAY,
             )
 
-        cumulative_prompt = _concat_prompts(previous_prompt, used_prompt)
+        def existing_segment():
+            if not job_set_id:
+                return None
+            return project.story_segments.filter(job_set_id=job_set_id).first()
 
-        with transaction.atomic():
-            seg = StorySegment.objects.create(
-                project=project,
-                position=next_position,
-                previous_video_url=previous_video_url,
-                previous_prompt=previous_prompt,
-                used_prompt=used_prompt,
-                new_video_url=new_video_url,
-                cumulative_prompt=cumulative_prompt,
-                job_set_id=job_set_id,
-                frame_image_url=frame_image_url,
-                meta=meta,
+        try:
+            with transaction.atomic():
+                # параллельные опросы (несколько вкладок) создают часть по очереди
+                Project.objects.select_for_update().filter(id=project.id).first()
+                # опрос повторяется, а часть создаётся один раз — по job_set_id
+                existing = existing_segment()
+                if existing:
+                    return Response(StorySegmentSerializer(existing).data)
+
+                # часть продолжает то состояние, с которого взят кадр; если история
+                # с тех пор изменилась, молча пришивать её к другой части нельзя
+                last_video_url, _, next_position = _get_last_state(project)
+                if (
+                    next_position != cont.position
+                    or last_video_url != cont.previous_video_url
+                ):
+                    return Response(
+                        {
+                            "detail": "История проекта изменилась, пока шла генерация; "
+                            "часть не может быть добавлена."
+                        },
+                        status=status.HTTP_409_CONFLICT,
+                    )
+
+                seg = StorySegment.objects.create(
+                    project=project,
+                    position=cont.position,
+                    previous_video_url=cont.previous_video_url,
+                    previous_prompt=cont.previous_prompt,
+                    used_prompt=used_prompt,
+                    new_video_url=new_video_url,
+                    cumulative_prompt=_concat_prompts(cont.previous_prompt, used_prompt),
+                    job_set_id=job_set_id,
+                    frame_image_url=frame_image_url,
+                    meta=meta,
+                )
+        except IntegrityError:
+            existing = existing_segment()
+            if existing:
+                return Response(StorySegmentSerializer(existing).data)
+            return Response(
+                {"detail": "Позиция уже занята другой частью истории."},
+                status=status.HTTP_409_CONFLICT,
             )
 
         return Response(